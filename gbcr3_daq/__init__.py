@@ -0,0 +1,24 @@
+'''
+Shared DAQ core of the GBCR3 test scripts.
+
+software/main.py, software/main_original.py and software_v2/main_v2.py put the
+repository root on sys.path and import from here:
+
+    crc32_8          frame CRC32 (bitwise reference, table and binascii paths)
+    frame_layout     declarative frame field spec and compiled extractors
+    error_records    ErrorRecord / ErrorBatch error-frame records
+    error_log        binary fixed-width error log (numpy.memmap) and its text converter
+    file_stats       FileStats.csv, one machine-readable row per file
+    run_catalog      SQLite catalog of the runs, their registers and statistics
+    channel_index    ChAll.TXT channel offset index, Ch{N}.TXT on demand
+    fifo_decoder     buffer helpers, FrameDecoder and StreamDecoder
+    parallel_decode  ordered process-pool decode stage
+    writer_pool      persistent buffered append handles of the error outputs
+    raw_capture      Raw.bin / Raw.idx capture of every FIFO buffer of a run
+    raw_archive      compressed, seekable Raw.arc / Raw.aix archive and open_capture
+    flight_recorder  ring of the last raw FIFO buffers, dumped on anomalies
+    backpressure     switch to counting-only decoding when the decode stage falls behind
+    decode           exec_data and its drop-ins, Filesummary.TXT / ChAll.TXT writers
+    summary          generate_summary of a run directory
+    iic              iic_write / iic_read / Current_monitor over the FPGA link
+'''
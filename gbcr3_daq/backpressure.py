@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Backpressure switch between full decoding and the counting-only decode.
+
+The readout loop reports a backlog figure once per FIFO buffer, scaled so that 1.0
+means the decode stage is just keeping up: the depth of the worker queue over its
+limit with --workers, otherwise the decode-and-write time of a buffer over the time
+its FIFO readout took. The monitor switches on a moving average of the figures
+(`smoothing` is the weight of the newest one, 1.0 = no averaging), so one slow
+buffer does not flip the mode. Above `high` the next buffers are decoded in the
+counting-only mode of FrameDecoder (ChStat only: no CRC of OK frames, no error
+records); at or below `low` full decoding resumes. Every switch is logged to
+Backpressure.TXT in the run directory together with the frames decoded so far in
+each mode.
+
+Without the CRC of OK frames, counting-only decoding detects an alignment loss
+only by a bad channel ID, so its alignment loss count (ChStat[2][10]) is a lower
+bound. The monitor keeps the alignment losses and bad channel IDs per mode and
+reports them with that caveat.
+'''
+import datetime
+
+MODES = ('full', 'counting-only')
+
+
+# ------------------------------------------------------------------#
+class BackpressureMonitor(object):
+    """Hysteresis switch fed by update(); count() tallies files, frames and alignment losses per mode."""
+    def __init__(self, high, low=None, log_path=None, smoothing=1.0):
+        self.high = high
+        self.low = high / 2 if low is None else low
+        self.log_path = log_path
+        self.smoothing = smoothing
+        self.backlog = None         # moving average of the update() figures
+        self.counting = False
+        self.switches = 0
+        self.files = [0, 0]         # [full, counting-only]
+        self.frames = [0, 0]
+        self.alignment_loss = [0, 0]
+        self.bad_channel_id = [0, 0]
+
+    def update(self, file_number, backlog):
+        """Feed the backlog measured before buffer file_number; returns True for counting-only."""
+        if self.backlog is None:
+            self.backlog = backlog
+        else:
+            self.backlog += self.smoothing * (backlog - self.backlog)
+        backlog = self.backlog
+        if (backlog <= self.low) if self.counting else (backlog > self.high):
+            self.counting = not self.counting
+            self.switches += 1
+            line = (f"{datetime.datetime.now()} file {file_number} backlog {backlog:.2f}: {MODES[self.counting]}, "
+                    f"frames so far {MODES[0]} {self.frames[0]} {MODES[1]} {self.frames[1]}\n")
+            print(f"Backpressure: {line}", end='')
+            if self.log_path:
+                with open(self.log_path, 'a') as infile:
+                    infile.write(line)
+        return self.counting
+
+    def count(self, file_stats, counting):
+        """Add one decoded file (its summarize_file file_stats) to the tally of its mode."""
+        self.files[counting] += 1
+        self.frames[counting] += sum(file_stats[1:8])
+        self.alignment_loss[counting] += file_stats[6]
+        self.bad_channel_id[counting] += file_stats[7]
+
+    def report(self):
+        return "\n".join((
+            f"Backpressure {self.high:g}/{self.low:g}: {self.switches} switches, "
+            f"{MODES[0]} {self.files[0]} files {self.frames[0]} frames, "
+            f"{MODES[1]} {self.files[1]} files {self.frames[1]} frames",
+            f"  alignment loss / bad channel ID: {MODES[0]} {self.alignment_loss[0]} / {self.bad_channel_id[0]}, "
+            f"{MODES[1]} {self.alignment_loss[1]} / {self.bad_channel_id[1]} "
+            f"(no CRC check in {MODES[1]}: its alignment losses are a lower bound)"))
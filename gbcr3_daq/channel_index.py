@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Per-channel offset index of ChAll.TXT, in place of the Ch{N}.TXT copies.
+
+While a run writes ChAll.TXT, ChannelIndex appends one fixed-width little-endian
+row per error line to ChAll.cix: the channel ID (u1), the byte offset of the line
+in ChAll.TXT (u8) and its length (u2), after a HEADER_BYTES header (magic
+b'GBCR3CIX', version). Every line is then written once instead of twice.
+ChannelReader seeks straight to the lines of one channel, and write_channel_files
+regenerates the Ch{N}.TXT files byte for byte:
+
+    python -m gbcr3_daq.channel_index QAResults_v2/<run>
+'''
+import os
+import sys
+import struct
+import atexit
+import collections
+
+from .error_records import ErrorBatch, ErrorRecord
+
+INDEX_MAGIC = b'GBCR3CIX'
+VERSION = 1
+HEADER_BYTES = 16
+INDEX_STRUCT = struct.Struct('<BQH')
+INDEX_HEADER = (INDEX_MAGIC + struct.pack('<H', VERSION)).ljust(HEADER_BYTES, b'\0')
+
+
+# ------------------------------------------------------------------#
+class ChannelIndex(object):
+    """Writer of ChAll.cix next to the ChAll.TXT of a run; until open() it indexes nothing."""
+    def __init__(self):
+        self.path = None
+        self._handle = None
+        self._offset = 0
+        atexit.register(self.close)
+
+    def open(self, store_dict):
+        """Index the ChAll.TXT of store_dict from its current end on."""
+        self.close()
+        all_path = f"./{store_dict}/ChAll.TXT"
+        self._offset = os.path.getsize(all_path) if os.path.exists(all_path) else 0
+        self.path = f"./{store_dict}/ChAll.cix"
+        self._handle = open(self.path, 'ab', buffering=1 << 16)
+        if self._handle.tell() == 0:
+            self._handle.write(INDEX_HEADER)
+
+    def add(self, records, lines):
+        """Index the lines of records just appended to ChAll.TXT (ASCII, so characters are bytes)."""
+        pack = INDEX_STRUCT.pack
+        offset = self._offset
+        rows = []
+        for record, line in zip(records, lines):
+            rows.append(pack(record.channel, offset, len(line)))
+            offset += len(line)
+        self._offset = offset
+        self._handle.write(b''.join(rows))
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self.path = None
+
+
+# ------------------------------------------------------------------#
+class ChannelReader(object):
+    """The ChAll.TXT lines of one channel at a time, read through ChAll.cix."""
+    def __init__(self, run_dir):
+        self.all_path = os.path.join(run_dir, 'ChAll.TXT')
+        self._spans = collections.defaultdict(list)
+        with open(os.path.join(run_dir, 'ChAll.cix'), 'rb') as in_file:
+            if in_file.read(HEADER_BYTES) != INDEX_HEADER:
+                raise ValueError(f"{run_dir}/ChAll.cix is not a version {VERSION} channel index")
+            data = in_file.read()
+        data = data[:len(data) // INDEX_STRUCT.size * INDEX_STRUCT.size]
+        for channel, offset, length in INDEX_STRUCT.iter_unpack(data):
+            self._spans[channel].append((offset, length))
+
+    def channels(self):
+        return sorted(self._spans)
+
+    def count(self, channel):
+        return len(self._spans.get(channel, ()))
+
+    def lines(self, channel):
+        """The Ch{channel}.TXT lines, newline included."""
+        with open(self.all_path, 'rb') as in_file:
+            lines = []
+            for offset, length in self._spans.get(channel, ()):
+                in_file.seek(offset)
+                lines.append(in_file.read(length).decode('ascii'))
+        return lines
+
+    def records(self, channel):
+        return ErrorBatch(ErrorRecord.from_line(line) for line in self.lines(channel))
+
+
+def write_channel_files(run_dir, channels=None):
+    """Generate Ch{N}.TXT of run_dir from ChAll.TXT and ChAll.cix; returns the channels written."""
+    reader = ChannelReader(run_dir)
+    channels = reader.channels() if channels is None else channels
+    for channel in channels:
+        with open(os.path.join(run_dir, f'Ch{channel}.TXT'), 'w') as outfile:
+            outfile.writelines(reader.lines(channel))
+    return channels
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m gbcr3_daq.channel_index QAResults_v2/<run>")
+    print(f"Generated Ch{{N}}.TXT for channels {write_channel_files(sys.argv[1])}")
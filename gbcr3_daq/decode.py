@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+FIFO buffer decoding shared by the DAQ entry points.
+
+exec_data is the frame-by-frame scan of one 50000-word readout (terminated by -1);
+exec_data_fast and exec_data_stream are the FrameDecoder / StreamDecoder drop-ins
+with the same signature. All of them append the aligned error records to ChAll.TXT
+and Ch{N}.TXT and the file counters to Filesummary.TXT in the run directory
+store_dict, and return (file_stats, current_channel_stats).
+'''
+import os
+import datetime
+
+from .channel_index import ChannelIndex
+from .error_log import ErrorLog
+from .file_stats import FileStatsStream
+from .error_records import ErrorRateLimiter, ErrorRecord
+from .fifo_decoder import (BatchCRC, FrameDecoder, StreamDecoder, FILLER_FRAME, fifo_to_bytes, find_filler,
+                           is_all_filler, dead_reckon)
+from .flight_recorder import FlightRecorder
+from .frame_layout import ERROR_FIELDS, FRAME_LAYOUT
+from .writer_pool import WriterPool
+
+# Constants
+NUM_CHANNELS = 9
+CHANNEL_STATS_SIZE = NUM_CHANNELS * 2  # Aligned OK + Aligned Error
+MAX_CHANNEL_ID = 10
+
+# frame field extractors compiled from the frame_layout spec
+unpack_status = FRAME_LAYOUT.compile(('error_flag', 'channel_id'))
+unpack_check = FRAME_LAYOUT.compile(('channel_id', 'crc32'))
+unpack_error = FRAME_LAYOUT.compile(ERROR_FIELDS)
+
+## per-channel cap on the error records written out, off until max_rate is set
+error_limiter = ErrorRateLimiter()
+## ChAll.TXT / Ch{N}.TXT / ErrorRate.TXT handles, opened per write until keep_open is set
+error_writers = WriterPool()
+## binary copy of the ChAll.TXT records, off until opened on a path
+error_log = ErrorLog()
+## FileStats.csv row per file, opened by the run
+file_stats_stream = FileStatsStream()
+## ChAll.TXT channel offset index, replacing the Ch{N}.TXT copies once opened
+channel_index = ChannelIndex()
+## ring of the last raw buffers, dumped on anomalies, off until its depth is set
+flight_recorder = FlightRecorder()
+
+
+# ------------------------------------------------------------------#
+def write_error_data(store_dict, channel_id, time_obj, channel_id_val, inject_error, error_counter, 
+                     crc_diff, time_stamp, expected_code, received_code, error_position, crc32):
+    """Write error data to both ChAll.TXT and individual channel files."""
+    write_error_records(store_dict, (ErrorRecord(time_obj, channel_id_val, inject_error, error_counter, crc_diff,
+                                                 time_stamp, expected_code, received_code, error_position, crc32),))
+
+def write_error_records(store_dict, records):
+    """Append a batch of ErrorRecords to ChAll.TXT, the channel files (or channel_index) and error_log.
+
+    Records above the error_limiter cap are left out and summarized in ErrorRate.TXT.
+    """
+    records = error_limiter.filter(records)
+    write_error_rate(store_dict)
+    _write_records(store_dict, records)
+
+def _write_records(store_dict, records):
+    if not records:
+        return
+    error_log.append(records)
+    lines = [record.line() for record in records]
+    error_writers.writelines(f"./{store_dict}/ChAll.TXT", lines)
+    if channel_index.path is not None:
+        channel_index.add(records, lines)
+        return
+    by_channel = {}
+    for record, line in zip(records, lines):
+        by_channel.setdefault(record.channel, []).append(line)
+    for channel_id, channel_lines in by_channel.items():
+        error_writers.writelines(f"./{store_dict}/Ch{channel_id}.TXT", channel_lines)
+
+def write_error_rate(store_dict, flush=False):
+    """Append the error_limiter summaries of closed windows to ErrorRate.TXT.
+
+    flush=True (end of run) first closes the open windows and writes their last held-back records.
+    """
+    if flush:
+        _write_records(store_dict, error_limiter.flush())
+    lines = error_limiter.summary_lines()
+    if lines:
+        error_writers.writelines(f"./{store_dict}/ErrorRate.TXT", lines)
+
+
+# ------------------------------------------------------------------#
+def exec_data(mem_data, store_dict, dbg_mode=0, current_file_number=0, readout_time=None):
+    isEnd = False
+    aligned = 0
+    i = 0
+
+    dbg = (dbg_mode == 1)
+    #
+    # Collect frame stat=2*Aligned+Err by channel  
+    # Ch=9 is filler without channel ID 
+    #
+    ChStat = [
+        [0,0,0,0,0,0,0,0,0,0,0],
+        [0,0,0,0,0,0,0,0,0,0,0],
+        [0,0,0,0,0,0,0,0,0,0,0],
+        [0,0,0,0,0,0,0,0,0,0,0]
+    ]
+    # big-endian byte image of the buffer, used for the alignment search and bulk CRCs
+    buf = fifo_to_bytes(mem_data)
+    flight_recorder.record(current_file_number, buf)
+    n_words = len(buf) // 4
+    crc_errors = 0
+    # CRCs of long aligned runs are computed in bulk (BatchCRC)
+    batch_crc = BatchCRC(buf)
+    while i < 50001:
+        # get 8 words to combine a frame
+        val = [0, 0, 0, 0, 0, 0, 0, 0]
+        for k in range(8):
+            if i > 50000:
+                isEnd = True
+            else:
+                val[k] = mem_data[i]
+                i = i + 1
+            #end if
+        if val[-1] < 0:
+            isEnd = True
+        if isEnd:
+            break
+        Rawdata = val[0] << (96 + 128) | val[1] << (64 + 128) | val[2] << (32 + 128) | val[3] << 128 | val[4] << 96 | val[5] << 64 | val[6] << 32 | val[7]
+        # end get 8 words
+        # tentative evaluation Error flag and channel ID  
+        StatErr, StatChan = unpack_status(*val)
+
+        aligned_error_counter = 0
+        if aligned == 1:
+            error_flag = StatErr
+
+            # if aligned, display on the screen and save to files
+            if error_flag == 1:
+                aligned_error_counter += 1
+                (channel_id, inject_error, error_counter, time_stamp, expected_code, received_code,
+                 error_position, crc32) = unpack_error(*val)
+                # CRC over the 28 payload bytes (words 0-6), batched over long aligned runs
+                cal_crc32 = batch_crc.crc(i - 8)
+                crc_errors += cal_crc32 != crc32
+
+                # host time of the error records: now, or the recorded readout time of a replayed buffer
+                Time = datetime.datetime.now() if readout_time is None else readout_time
+                if dbg == 1 and aligned_error_counter < 20: 
+                    print(f'{Time} {channel_id} {inject_error} {error_counter} {cal_crc32 - crc32} {time_stamp} {expected_code:08x} {received_code:08x} {error_position:08x} {crc32}')
+                
+                # Write error data to both files using helper function
+                write_error_data(store_dict, channel_id, Time, channel_id, inject_error, error_counter, 
+                               cal_crc32 - crc32, time_stamp, expected_code, received_code, error_position, crc32)
+                # Frame stat Aligned with Error
+                if channel_id < MAX_CHANNEL_ID:
+                    ChStat[3][channel_id] = ChStat[3][channel_id] + 1
+                else:
+                    if dbg == 1: print(f"Bad channel_id {channel_id}")
+                    ChStat[3][10] = ChStat[3][10] + 1
+                #end if
+            else:  # error_flag != 1
+                if Rawdata == 0x3c5c_7c5c_0000_0000_0000_0000_1234_4321_7d6d_7a5a_0000_0000_0000_0000_5566_6655:
+                    ChStat[2][9] = ChStat[2][9] + 1 
+                else:
+                    channel_id, crc32 = unpack_check(*val)
+                    # CRC over the 28 payload bytes (words 0-6), batched over long aligned runs
+                    cal_crc32 = batch_crc.crc(i - 8)
+                        
+                    if cal_crc32 - crc32 == 0 and channel_id < MAX_CHANNEL_ID:
+                        ChStat[2][channel_id] = ChStat[2][channel_id] + 1
+                    else:
+                        aligned = 0
+                        if dbg == 1: print(f"Line 407, ALignment loss Rawdata is {Rawdata:x}")
+                        ChStat[2][10] = ChStat[2][10] + 1
+            # end if error_flag
+        else:  # aligned != 1
+            if i<200 and dbg == 1:
+                print(f"Not aligned chan={StatChan}  Rawdata={Rawdata:x}")
+            # Search the byte image for the next word-aligned filler frame, starting one
+            # word after the current frame, and dead reckon only the skipped windows
+            found = find_filler(buf, i - 7)
+            dead_reckon(buf, i - 7, found if found >= 0 else n_words - 7, ChStat, NUM_CHANNELS - 1, dbg)
+            if found >= 0 and i == 8 and is_all_filler(buf, found):
+                # Fast path: after the initial resync the rest of the buffer is pure filler,
+                # which one compare against the repeated-filler image settles
+                ChStat[2][9] = ChStat[2][9] + (n_words - found) // 8
+                isEnd = True
+                break
+            elif found >= 0:
+                aligned = 1
+                # Filler frame without channel - use chan=9
+                ChStat[2][9] = ChStat[2][9] + 1
+                i = found + 8
+            else:
+                # the frame just read is only tested when the buffer ends right after it
+                if i == n_words and buf[(i - 8) * 4:i * 4] == FILLER_FRAME:
+                    ChStat[2][9] = ChStat[2][9] + 1
+                isEnd = True
+                break
+            # end if found
+        # end if aligned
+    # end for 6250. One buffer is done.
+
+    flight_recorder.check(ChStat, crc_errors, store_dict, current_file_number)
+    return summarize_file(ChStat, store_dict, dbg, current_file_number)
+# end def exec_data
+
+
+# ------------------------------------------------------------------------------------------------#
+## frame decoder reused across files by exec_data_fast
+frame_decoder = FrameDecoder(NUM_CHANNELS - 1, MAX_CHANNEL_ID)
+
+def exec_data_fast(mem_data, store_dict, dbg_mode=0, current_file_number=0, readout_time=None):
+    """Drop-in for exec_data built on the struct based FrameDecoder (no NumPy needed)."""
+    buf = fifo_to_bytes(mem_data)
+    flight_recorder.record(current_file_number, buf)
+    ChStat, errors = frame_decoder.decode(buf, dbg_mode == 1)
+    return record_file(ChStat, errors, store_dict, dbg_mode, current_file_number, readout_time)
+# end def exec_data_fast
+
+
+def record_file(ChStat, errors, store_dict, dbg_mode=0, current_file_number=0, readout_time=None):
+    """Write the error records and the file summary of one decoded buffer.
+
+    A readout_time (the recorded host time of a replayed buffer) replaces the decode time of the records.
+    """
+    dbg = (dbg_mode == 1)
+    if readout_time is not None:
+        for record in errors:
+            record.time = readout_time
+    if dbg == 1:
+        for record in errors:
+            print(record.line(), end='')
+    write_error_records(store_dict, errors)
+    if flight_recorder.depth:
+        flight_recorder.check(ChStat, sum(1 for record in errors if record.crc_diff), store_dict, current_file_number)
+    return summarize_file(ChStat, store_dict, dbg, current_file_number)
+# end def record_file
+
+
+## stream decoder carrying alignment and the partial trailing frame from file to file
+stream_decoder = StreamDecoder(NUM_CHANNELS - 1, MAX_CHANNEL_ID)
+
+def exec_data_stream(mem_data, store_dict, dbg_mode=0, current_file_number=0, readout_time=None):
+    """Decode one FIFO buffer as the next piece of a continuous stream.
+
+    Per-file statistics count the frames completed by this buffer; a frame straddling
+    two buffers is counted in the second one. readout_time is as in record_file.
+    """
+    dbg = (dbg_mode == 1)
+    buf = fifo_to_bytes(mem_data)
+    flight_recorder.record(current_file_number, buf)
+    events = stream_decoder.feed(buf, dbg)
+    if readout_time is not None:
+        for record in stream_decoder.errors:
+            record.time = readout_time
+    for kind, word_index, record in events:
+        if kind == 'error':
+            if dbg == 1:
+                print(record.line(), end='')
+        elif dbg == 1:
+            print(f"Stream {kind} at word {word_index}")
+    write_error_records(store_dict, stream_decoder.errors)
+    if flight_recorder.depth:
+        flight_recorder.check(stream_decoder.ChStat, sum(1 for record in stream_decoder.errors if record.crc_diff),
+                              store_dict, current_file_number)
+    return summarize_file(stream_decoder.ChStat, store_dict, dbg, current_file_number)
+# end def exec_data_stream
+
+
+# ------------------------------------------------------------------------------------------------#
+def start_file_summary(store_dict):
+    """Create Filesummary.TXT with its column header unless the run directory already has one."""
+    if os.path.exists(f"./{store_dict}/Filesummary.TXT") == False:
+        with open(f"./{store_dict}/Filesummary.TXT", 'w') as infile:
+            infile.write('# File_num  Filler_Frames  Aligned_OK  Aligned_Err  NotAligned_Err  NotAligned_OK  Alignment_Loss  Bad_ChannelID  Total_Frames\n')
+
+
+def summarize_file(ChStat, store_dict, dbg=False, current_file_number=0):
+    """Turn the ChStat counters of one buffer into file_stats and append them to Filesummary.TXT (and FileStats.csv)."""
+    ChanCnt_NA_OK = 0
+    ChanCnt_NA_Err = 0
+    ChanCnt_AL_Err = 0
+    ChanCnt_AL_OK = 0
+    Total_frames = 0
+    
+    for n in range(3):
+        if n == 0:
+            for m in range(11):
+                ChanCnt_NA_OK = ChanCnt_NA_OK + ChStat[n][m]
+        if n == 1:
+            for m in range(11):
+                ChanCnt_NA_Err = ChanCnt_NA_Err + ChStat[n][m]
+        if n > 1:
+            for m in range(NUM_CHANNELS):
+                if dbg == 1:
+                    print(f" file summary Chan {m}: Data frame Aligned Err/OK={ChStat[3][m]}/{ChStat[2][m]}")
+                ChanCnt_AL_Err += ChStat[3][m]
+                ChanCnt_AL_OK  += ChStat[2][m]
+
+    if dbg == 1:
+        print(f" file summary filler frames= {ChStat[2][9]}")
+        print(f" file summary aligned data OK= {ChanCnt_AL_OK}")
+        print(f" file summary aligned data Err= {ChanCnt_AL_Err}")
+        print(f" file summary: Not aligned Err/OK={ChanCnt_NA_Err}/{ChanCnt_NA_OK}")
+        print(f" file summary ALignment loss: {ChStat[2][10]}")
+        print(f" file summary Aligned with Error, bad channel id: {ChStat[3][10]}")
+        print(" Next File...")
+        
+    Total_frames = ChStat[2][9] + ChanCnt_AL_OK + ChanCnt_AL_Err + ChanCnt_NA_Err + ChanCnt_NA_OK + ChStat[2][10] + ChStat[3][10]
+
+    data_exist_counter = ChanCnt_AL_OK + ChanCnt_AL_Err
+
+    file_stats = [1,ChStat[2][9], ChanCnt_AL_OK, ChanCnt_AL_Err, ChanCnt_NA_Err, ChanCnt_NA_OK, ChStat[2][10], 
+                 ChStat[3][10], 1 if data_exist_counter == 0 else 0]
+
+    # Collect channel statistics: [aligned_OK_ch0..ch8, aligned_Error_ch0..ch8]
+    current_channel_stats = [ChStat[2][i] for i in range(NUM_CHANNELS)]  # Aligned OK
+    current_channel_stats.extend([ChStat[3][i] for i in range(NUM_CHANNELS)])  # Aligned Error
+
+
+    with open(f"./{store_dict}/Filesummary.TXT", 'a') as infile:
+        infile.write(f'{current_file_number} {file_stats[1]} {file_stats[2]} {file_stats[3]} {file_stats[4]} {file_stats[5]} {file_stats[6]} {file_stats[7]} {Total_frames}\n')
+        infile.flush()
+
+        infile.write('Channel Aligned_OK Aligned_Error\n')
+        for i in range(NUM_CHANNELS):
+            infile.write(f'Channel_{i} {current_channel_stats[i]} {current_channel_stats[NUM_CHANNELS + i]}\n')
+    file_stats_stream.append(current_file_number, file_stats, current_channel_stats, Total_frames)
+    # file boundary: time based flush of the error outputs
+    error_writers.tick()
+    return file_stats, current_channel_stats
+# end def summarize_file
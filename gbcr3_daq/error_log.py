@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Binary error log: the ChAll.TXT records as fixed-width binary rows.
+
+The file starts with a HEADER_BYTES header: the magic b'GBCR3ERR', the format
+version, header and record sizes (little-endian u2 each) and the column list
+"name:type,..." of ERROR_RECORD_COLUMNS, NUL padded. It is followed by 51-byte
+packed little-endian records, time as microseconds since 1970-01-01 (naive host
+time, like datetime64[us]). Records are only ever appended, so
+
+    np.memmap(path, dtype=ERROR_RECORD_DTYPE, mode='r', offset=HEADER_BYTES)
+
+maps a whole run without parsing, see map_error_log. Writing needs no NumPy.
+Regenerate the text files of a run with
+
+    python -m gbcr3_daq.error_log QAResults_v2/<run>/ErrorLog.bin out_dir
+'''
+import os
+import sys
+import struct
+import atexit
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .error_records import ERROR_RECORD_COLUMNS, ERROR_RECORD_DTYPE, ErrorBatch, ErrorRecord
+
+MAGIC = b'GBCR3ERR'
+VERSION = 1
+HEADER_BYTES = 256
+RECORD_STRUCT = struct.Struct('<qBHQqQIIII')
+COLUMNS = ','.join(f"{name}:{kind}" for name, kind in ERROR_RECORD_COLUMNS)
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def error_log_header():
+    header = MAGIC + struct.pack('<3H', VERSION, HEADER_BYTES, RECORD_STRUCT.size) + COLUMNS.encode('ascii')
+    return header.ljust(HEADER_BYTES, b'\0')
+
+
+def check_header(header):
+    """Raise ValueError unless header is the one this module writes."""
+    if header != error_log_header():
+        raise ValueError("not a version 1 GBCR3 binary error log with the ERROR_RECORD_COLUMNS layout")
+
+
+# ------------------------------------------------------------------#
+class ErrorLog(object):
+    """Append-only writer of a binary error log; path None writes nothing."""
+    def __init__(self, path=None, buffering=1 << 20):
+        self.path = None
+        self.buffering = buffering
+        self._handle = None
+        atexit.register(self.close)
+        if path is not None:
+            self.open(path)
+
+    def open(self, path):
+        self.close()
+        self.path = path
+        self._handle = open(path, 'ab', buffering=self.buffering)
+        if self._handle.tell() == 0:
+            self._handle.write(error_log_header())
+
+    def append(self, records):
+        if self._handle is None or not records:
+            return
+        pack = RECORD_STRUCT.pack
+        self._handle.write(b''.join(
+            pack((record.time - EPOCH) // MICROSECOND, record.channel, record.inject_error, record.error_counter,
+                 record.crc_diff, record.time_stamp, record.expected_code, record.received_code,
+                 record.error_position, record.crc32)
+            for record in records))
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+# ------------------------------------------------------------------#
+def read_error_log(path):
+    """ErrorBatch of all records of a binary error log (no NumPy needed)."""
+    with open(path, 'rb') as in_file:
+        check_header(in_file.read(HEADER_BYTES))
+        data = in_file.read()
+    data = data[:len(data) // RECORD_STRUCT.size * RECORD_STRUCT.size]
+    return ErrorBatch(ErrorRecord(EPOCH + row[0] * MICROSECOND, *row[1:]) for row in RECORD_STRUCT.iter_unpack(data))
+
+
+def map_error_log(path):
+    """Read-only numpy.memmap of the records of a binary error log, ERROR_RECORD_DTYPE rows."""
+    if np is None:
+        raise ImportError("map_error_log needs NumPy")
+    with open(path, 'rb') as in_file:
+        check_header(in_file.read(HEADER_BYTES))
+    count = (os.path.getsize(path) - HEADER_BYTES) // RECORD_STRUCT.size
+    return np.memmap(path, dtype=ERROR_RECORD_DTYPE, mode='r', offset=HEADER_BYTES, shape=(count,))
+
+
+def error_log_to_text(path, out_dir):
+    """Regenerate ChAll.TXT and Ch{N}.TXT of a binary error log in out_dir."""
+    all_lines = []
+    by_channel = {}
+    for record in read_error_log(path):
+        line = record.line()
+        all_lines.append(line)
+        by_channel.setdefault(record.channel, []).append(line)
+    with open(os.path.join(out_dir, 'ChAll.TXT'), 'w') as outfile:
+        outfile.writelines(all_lines)
+    for channel_id, lines in by_channel.items():
+        with open(os.path.join(out_dir, f'Ch{channel_id}.TXT'), 'w') as outfile:
+            outfile.writelines(lines)
+    return len(all_lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m gbcr3_daq.error_log ErrorLog.bin out_dir")
+    out_dir = sys.argv[2]
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"{error_log_to_text(sys.argv[1], out_dir)} records written to {out_dir}")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Compact representation of aligned error-frame records.
+
+ErrorRecord holds one record in __slots__ (no per-instance dict); ErrorBatch is the
+list of records a decoder emits for one buffer. With NumPy a batch converts to and
+from a structured array of ERROR_RECORD_DTYPE, 51 bytes per record, for analysis
+of long runs. The text form of a record is the ChAll.TXT / Ch{N}.TXT line.
+ErrorRateLimiter caps the records written per channel during error bursts.
+'''
+import datetime
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ERROR_RECORD_FIELDS = ('time', 'channel', 'inject_error', 'error_counter', 'crc_diff', 'time_stamp',
+                       'expected_code', 'received_code', 'error_position', 'crc32')
+
+# fixed-width little-endian layout of a record, packed (51 bytes)
+ERROR_RECORD_COLUMNS = (
+    ('time', '<M8[us]'),            # host time the frame was decoded
+    ('channel', 'u1'),
+    ('inject_error', '<u2'),
+    ('error_counter', '<u8'),       # 59 bits
+    ('crc_diff', '<i8'),            # computed - received CRC
+    ('time_stamp', '<u8'),          # 48 bits
+    ('expected_code', '<u4'),
+    ('received_code', '<u4'),
+    ('error_position', '<u4'),
+    ('crc32', '<u4'),
+)
+
+if np is not None:
+    ERROR_RECORD_DTYPE = np.dtype(list(ERROR_RECORD_COLUMNS))
+else:
+    ERROR_RECORD_DTYPE = None
+
+
+# ------------------------------------------------------------------#
+class ErrorRecord(object):
+    """One aligned error frame; iterates like the tuple of ERROR_RECORD_FIELDS."""
+    __slots__ = ERROR_RECORD_FIELDS
+
+    def __init__(self, time, channel, inject_error, error_counter, crc_diff, time_stamp,
+                 expected_code, received_code, error_position, crc32):
+        self.time = time
+        self.channel = channel
+        self.inject_error = inject_error
+        self.error_counter = error_counter
+        self.crc_diff = crc_diff
+        self.time_stamp = time_stamp
+        self.expected_code = expected_code
+        self.received_code = received_code
+        self.error_position = error_position
+        self.crc32 = crc32
+
+    def astuple(self):
+        return (self.time, self.channel, self.inject_error, self.error_counter, self.crc_diff, self.time_stamp,
+                self.expected_code, self.received_code, self.error_position, self.crc32)
+
+    def __iter__(self):
+        return iter(self.astuple())
+
+    def __eq__(self, other):
+        return isinstance(other, ErrorRecord) and self.astuple() == other.astuple()
+
+    def __repr__(self):
+        return f"ErrorRecord{self.astuple()!r}"
+
+    def __getstate__(self):
+        return self.astuple()
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def line(self):
+        """The ChAll.TXT / Ch{N}.TXT line of the record, newline included."""
+        return (f'{self.time} {self.channel} {self.inject_error} {self.error_counter} {self.crc_diff} {self.time_stamp} '
+                f'{self.expected_code:08x} {self.received_code:08x} {self.error_position:08x} {self.crc32}\n')
+
+    @classmethod
+    def from_line(cls, line):
+        """Parse a ChAll.TXT / Ch{N}.TXT line back into a record."""
+        date, clock, channel, inject_error, error_counter, crc_diff, time_stamp, expected, received, position, crc32 = line.split()
+        return cls(datetime.datetime.fromisoformat(f"{date} {clock}"), int(channel), int(inject_error), int(error_counter),
+                   int(crc_diff), int(time_stamp), int(expected, 16), int(received, 16), int(position, 16), int(crc32))
+
+
+class ErrorBatch(list):
+    """The ErrorRecords of one decoded buffer, in frame order."""
+    def lines(self):
+        return [record.line() for record in self]
+
+    def to_array(self):
+        """Structured array of ERROR_RECORD_DTYPE (needs NumPy)."""
+        return np.array([record.astuple() for record in self], dtype=ERROR_RECORD_DTYPE)
+
+    @classmethod
+    def from_array(cls, array):
+        return cls(ErrorRecord(*row) for row in array.astype(ERROR_RECORD_DTYPE).tolist())
+
+
+def read_error_file(path):
+    """ErrorBatch of all records in a ChAll.TXT / Ch{N}.TXT file, blank lines skipped."""
+    with open(path, 'r') as in_file:
+        return ErrorBatch(ErrorRecord.from_line(line) for line in in_file if line.strip())
+
+
+# ------------------------------------------------------------------#
+class ErrorRateLimiter(object):
+    """Per-channel cap on the error records written out; the counts stay exact.
+
+    Within a window of `window` seconds (host time of the records) each channel
+    passes at most max_rate * window records; the rest of that window is held back.
+    When the window closes its last held-back record is passed after all, so the
+    window's final error_counter / inject count still reach ChAll.TXT (and
+    generate_summary), and the others are summarized in one line (how many, and the
+    error_counter range they cover). max_rate = 0 passes everything. seen / written
+    count the records per channel; ChStat and Filesummary.TXT are not affected.
+    """
+    def __init__(self, max_rate=0, window=1.0):
+        self.max_rate = max_rate
+        self.window = datetime.timedelta(seconds=window)
+        self.seen = collections.Counter()
+        self.written = collections.Counter()
+        # channel -> [start, records, held back, first held back, last held back, one before the last]
+        self._windows = {}
+        self._summaries = []
+
+    def filter(self, records):
+        """The records of a batch that are within the cap, in order.
+
+        The last held-back records of the windows the batch closes come first.
+        """
+        if not self.max_rate or not records:
+            return records
+        cap = self.max_rate * self.window.total_seconds()
+        now = records[0].time
+        kept = []
+        for channel, state in list(self._windows.items()):
+            if now - state[0] >= self.window:
+                self._close(channel, kept)
+        for record in records:
+            channel = record.channel
+            self.seen[channel] += 1
+            state = self._windows.get(channel)
+            if state is None or record.time - state[0] >= self.window:
+                if state is not None:
+                    self._close(channel, kept)
+                state = self._windows[channel] = [record.time, 0, 0, None, None, None]
+            state[1] += 1
+            if state[1] <= cap:
+                kept.append(record)
+                self.written[channel] += 1
+            else:
+                state[2] += 1
+                if state[3] is None:
+                    state[3] = record
+                state[5] = state[4]
+                state[4] = record
+        return kept
+
+    def flush(self):
+        """Close every open window; returns their last held-back records."""
+        kept = []
+        for channel in list(self._windows):
+            self._close(channel, kept)
+        return kept
+
+    def _close(self, channel, kept):
+        start, records, held, first, last, before_last = self._windows.pop(channel)
+        if not held:
+            return
+        kept.append(last)
+        self.written[channel] += 1
+        if held > 1:
+            self._summaries.append(f"{start} {channel} {held - 1} of {records} error records not written, "
+                                   f"error_counter {first.error_counter}..{before_last.error_counter}\n")
+
+    def summary_lines(self):
+        """Summary lines of the windows closed so far."""
+        lines, self._summaries = self._summaries, []
+        return lines
+
+    def report(self):
+        """One-line written/seen count of the channels with records held back."""
+        held = [f"Ch{channel} {self.written[channel]}/{self.seen[channel]}"
+                for channel in sorted(self.seen) if self.written[channel] < self.seen[channel]]
+        return f"Error rate cap {self.max_rate}/s per channel: written/seen {', '.join(held) if held else 'all records written'}"
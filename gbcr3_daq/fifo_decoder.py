@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Buffer-level helpers for decoding GBCR3 data FIFO readouts.
+
+A FIFO buffer is the list of 32-bit words returned by read_data_fifo, terminated
+by -1. A frame is 8 words; as bytes it is 32 bytes big-endian, the first 28 bytes
+(words 0-6) are the CRC payload and the last word is the frame CRC32. The field
+positions come from the frame_layout spec.
+NumPy is optional: without it the batched paths are unavailable and callers fall
+back to per-frame crc32_frame. FrameDecoder decodes in pure Python; with NumPy it
+batches the CRCs of long aligned runs (see BATCH_AFTER).
+'''
+import struct
+import datetime
+import functools
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .crc32_8 import CRC32_INIT, CRC32_TABLE, crc32_frame
+from .frame_layout import ERROR_FIELDS, FRAME_LAYOUT
+from .error_records import ErrorBatch, ErrorRecord
+
+FRAME_WORDS = 8
+FRAME_STRUCT = struct.Struct('>8I')
+FRAME_BYTES = 32
+PAYLOAD_BYTES = 28
+FILLER_WORDS = (0x3c5c_7c5c, 0x0000_0000, 0x0000_0000, 0x1234_4321,
+                0x7d6d_7a5a, 0x0000_0000, 0x0000_0000, 0x5566_6655)
+FILLER_FRAME = struct.pack('>8I', *FILLER_WORDS)
+# A full 50000-word readout of nothing but filler, compared in one go by is_all_filler
+FILLER_IMAGE = FILLER_FRAME * (50000 // FRAME_WORDS)
+# Aligned frames whose CRC is computed one by one before the rest of the aligned run
+# is batched. A NumPy batch costs less per frame than crc32_frame only from a few
+# hundred frames on, and a batch past an alignment loss is wasted, so each batch
+# covers as many frames as the run had lasted when it was started.
+BATCH_AFTER = 256
+
+# the decode loops read the error flag, channel ID and CRC straight from their frame word
+ERR_WORD, ERR_SHIFT, ERR_MASK = FRAME_LAYOUT.word_field('error_flag')
+CHAN_WORD, CHAN_SHIFT, CHAN_MASK = FRAME_LAYOUT.word_field('channel_id')
+CRC_WORD, CRC_SHIFT, CRC_MASK = FRAME_LAYOUT.word_field('crc32')
+unpack_error_fields = FRAME_LAYOUT.compile(ERROR_FIELDS)
+
+if np is not None:
+    _CRC32_TABLE_NP = np.array(CRC32_TABLE, dtype=np.uint32)
+    _FILLER_ROW = np.frombuffer(FILLER_FRAME, dtype=np.uint8)
+
+
+# ------------------------------------------------------------------#
+def fifo_word_count(mem_data):
+    """Number of valid words in a FIFO buffer, i.e. up to the -1 end marker."""
+    try:
+        return mem_data.index(-1)
+    except ValueError:
+        return len(mem_data)
+
+
+def fifo_to_bytes(mem_data):
+    """Pack the valid FIFO words into one big-endian byte string."""
+    n = fifo_word_count(mem_data)
+    return struct.pack(f'>{n}I', *mem_data[:n])
+
+
+# ------------------------------------------------------------------#
+def find_filler(buf, start_word):
+    """Word index of the first word-aligned filler frame at or after start_word, -1 if none."""
+    pos = buf.find(FILLER_FRAME, start_word * 4)
+    while pos > 0 and pos % 4:
+        pos = buf.find(FILLER_FRAME, pos + 1)
+    return pos if pos < 0 else pos // 4
+
+
+def is_all_filler(buf, start_word):
+    """True if every whole frame from start_word to the end of buf is a filler frame."""
+    length = (len(buf) // 4 - start_word) // FRAME_WORDS * FRAME_BYTES
+    if length > len(FILLER_IMAGE):
+        return buf.count(FILLER_FRAME, start_word * 4, start_word * 4 + length) * FRAME_BYTES == length
+    return buf.startswith(FILLER_IMAGE[:length], start_word * 4)
+
+
+def dead_reckon(buf, first_window, end_window, ChStat, bad_chan, dbg=False, base_word=0):
+    """Dead-reckoning stats for the not-aligned windows first_window..end_window-1.
+
+    Same rule as the word-by-word scan in exec_data: only windows starting at a
+    word index with index % 8 == 1 are counted, by the error flag and channel ID the
+    window holds; channel IDs above bad_chan are clamped to bad_chan. base_word is
+    the index of buf's first word in a longer stream, the rule applies to that.
+    """
+    first = first_window + (1 - base_word - first_window) % FRAME_WORDS
+    for w in range(first, end_window, FRAME_WORDS):
+        words = FRAME_STRUCT.unpack_from(buf, w * 4)
+        ErrNA = words[ERR_WORD] >> ERR_SHIFT & ERR_MASK
+        ChanNA = words[CHAN_WORD] >> CHAN_SHIFT & CHAN_MASK
+        if ChanNA > bad_chan:
+            if dbg: print(f"Not aligned i={base_word + w + 8} bad chan={ChanNA}  Rawdata={int.from_bytes(buf[w * 4:w * 4 + 32], 'big'):x}")
+            ChanNA = bad_chan
+        else:
+            if dbg: print(f"Not aligned i={base_word + w + 8} chan={ChanNA}  Rawdata={int.from_bytes(buf[w * 4:w * 4 + 32], 'big'):x}")
+        ChStat[ErrNA][ChanNA] += 1
+
+
+# ------------------------------------------------------------------#
+def crc32_frames(payloads):
+    """Vectorized CRC32 of every row of an (N, 28) uint8 payload matrix."""
+    crc = np.full(payloads.shape[0], CRC32_INIT, dtype=np.uint32)
+    for k in range(payloads.shape[1]):
+        crc = (crc << np.uint32(8)) ^ _CRC32_TABLE_NP[(crc >> np.uint32(24)) ^ payloads[:, k]]
+    return crc
+
+
+def buffer_frames(buf, offset=0, count=None):
+    """View the whole frames of buf starting at byte offset (at most count) as an (N, 32) uint8 matrix."""
+    n = (len(buf) - offset) // FRAME_BYTES
+    if count is not None:
+        n = min(n, count)
+    if n <= 0:
+        return np.zeros((0, FRAME_BYTES), dtype=np.uint8)
+    return np.frombuffer(buf, dtype=np.uint8, count=n * FRAME_BYTES, offset=offset).reshape(n, FRAME_BYTES)
+
+
+def batch_crc(buf, offset=0, count=None):
+    """CRC32 of every non-filler frame of buf in one pass.
+
+    Frames are taken back to back from byte offset, at most count of them. Returns
+    (frame_index, calculated, match): the indices of the non-filler frames, the CRCs
+    computed over their 28-byte payload and a boolean array telling whether those
+    equal their CRC field.
+    """
+    frames = buffer_frames(buf, offset, count)
+    frame_index = np.flatnonzero((frames != _FILLER_ROW).any(axis=1))
+    data = frames[frame_index]
+    received = FRAME_LAYOUT.columns(data.view('>u4'), ('crc32',))['crc32']
+    calculated = crc32_frames(data[:, :PAYLOAD_BYTES])
+    return frame_index, calculated, calculated == received
+
+
+def batch_crc_check(buf, offset=0):
+    """(frame_index, match) of batch_crc: which non-filler frames have a valid CRC."""
+    frame_index, calculated, match = batch_crc(buf, offset)
+    return frame_index, match
+
+
+def batch_crc_tables(buf, offset, count):
+    """(calculated, match) lists of the count frames from byte offset; filler frames get 0 / False."""
+    frame_index, calculated, match = batch_crc(buf, offset, count)
+    n_frames = len(buffer_frames(buf, offset, count))
+    crc_table = np.zeros(n_frames, dtype=np.uint32)
+    match_table = np.zeros(n_frames, dtype=bool)
+    crc_table[frame_index] = calculated
+    match_table[frame_index] = match
+    return crc_table.tolist(), match_table.tolist()
+
+
+# ------------------------------------------------------------------#
+def cached_crc32_frame(maxsize):
+    """crc32_frame behind a bounded LRU cache keyed by the payload bytes.
+
+    Steady-state runs repeat the same OK payload between counter changes; those hit
+    the cache and skip the CRC. The least recently used payload is evicted once
+    maxsize entries are held; cache_info() reports hits, misses and the size.
+    """
+    return functools.lru_cache(maxsize=maxsize)(crc32_frame)
+
+
+def wilson_upper(k, n, z=1.96):
+    """Upper Wilson score bound of the rate k/n (z=1.96: 95% two-sided); 1.0 when n is 0."""
+    if n == 0:
+        return 1.0
+    p = k / n
+    centre = p + z * z / (2 * n)
+    spread = z * (p * (1 - p) / n + z * z / (4 * n * n)) ** 0.5
+    return min(1.0, (centre + spread) / (1 + z * z / n))
+
+
+def crc_sample_report(decoder):
+    """One-line summary of the CRC checks of a FrameDecoder running with crc_sample > 1."""
+    n, k = decoder.crc_checked[0], decoder.crc_mismatches[0]
+    rate = k / n if n else 0.0
+    return (f"CRC sampling 1/{decoder.crc_sample}: {k} mismatches in {n} sampled OK frames "
+            f"(rate {rate:.3g}, 95% upper bound {wilson_upper(k, n):.3g}); "
+            f"{decoder.crc_mismatches[1]} mismatches in {decoder.crc_checked[1]} frames checked after an anomaly")
+
+
+def resync_report(decoder):
+    """One-line summary of the resyncs of a FrameDecoder running with resync_probe > 0."""
+    locks, scans = decoder.resyncs
+    return f"Phase resync over {decoder.resync_probe} frames: {locks} phase locks, {scans} fallbacks to the filler scan"
+
+
+def crc_cache_report(crc32):
+    """One-line hit/miss summary of a cached_crc32_frame function."""
+    info = crc32.cache_info()
+    lookups = info.hits + info.misses
+    rate = info.hits / lookups if lookups else 0.0
+    return f"CRC cache: {info.hits} hits / {info.misses} misses ({rate:.1%} hit rate), {info.currsize}/{info.maxsize} entries"
+
+
+# ------------------------------------------------------------------#
+class BatchCRC(object):
+    """Per-buffer CRC lookup for exec_data.
+
+    Requests come frame by frame along an aligned run. The first BATCH_AFTER frames
+    of a run (a run ends when the word phase, word index % 8, changes) get crc32_frame;
+    after that batch_crc_tables covers the next frames in one go, as many as the run
+    has lasted so far. Without NumPy every frame gets crc32_frame.
+    """
+    def __init__(self, buf):
+        self._buf = buf
+        self._run_start = None      # word index of the first frame of the current run
+        self._span_start = 0        # word index of the first frame of the batched span
+        self._span = []
+
+    def crc(self, word_index):
+        """Calculated CRC32 of the frame starting at word_index."""
+        k = (word_index - self._span_start) // FRAME_WORDS
+        if 0 <= k < len(self._span) and (word_index - self._span_start) % FRAME_WORDS == 0:
+            return self._span[k]
+        if self._run_start is None or (word_index - self._run_start) % FRAME_WORDS:
+            self._run_start = word_index
+        run = (word_index - self._run_start) // FRAME_WORDS
+        if np is None or run < BATCH_AFTER:
+            return crc32_frame(self._buf[word_index * 4:word_index * 4 + PAYLOAD_BYTES])
+        self._span_start = word_index
+        self._span = batch_crc_tables(self._buf, word_index * 4, run)[0]
+        return self._span[0]
+
+
+# ------------------------------------------------------------------#
+class FrameDecoder(object):
+    """Pure-Python FIFO buffer decoder with the same statistics as exec_data.
+
+    Frames are walked with struct iter_unpack over a memoryview of the byte image and
+    the fields are taken from the individual 32-bit words with fixed shifts and masks,
+    so no 256-bit integer is built per frame. ChStat is preallocated and reset for
+    every buffer; decode returns it together with the ErrorBatch of aligned error
+    records. Both are reused by the next decode call, so consume them first. With crc_cache > 0 the frame CRCs go through
+    a cached_crc32_frame of that size.
+
+    With crc_sample = N > 1 only one aligned OK frame in N has its CRC verified; the
+    others are counted as OK on their channel ID alone. Error-flagged frames and the
+    first OK frame after an alignment lock or an error frame are always verified.
+    crc_checked / crc_mismatches count [sampled, after anomaly] checks over the whole
+    run, see crc_sample_report.
+
+    counting = True is the counting-only mode used under backpressure: ChStat is
+    still updated, but no CRC is computed (OK frames count on their channel ID) and
+    error frames are counted without building records.
+
+    With NumPy an aligned run that has lasted BATCH_AFTER frames goes on in batched
+    spans: batch_crc_tables gives the CRCs and CRC matches of as many frames as the
+    run has lasted, instead of one crc32 call per frame. batch_crc = False, a CRC
+    cache, CRC sampling or the counting-only mode keep the per-frame path.
+
+    With resync_probe = P > 0 an alignment loss is followed by a phase resync instead
+    of the word scan: the 8 phase offsets starting at the frame after the bad one are
+    scored on their next P frames (filler or a valid CRC each score 1) and the best
+    phase, the earliest on a tie, is locked at once. Only if no phase scores does the
+    filler scan run. resyncs counts [phase locks, scans]. The statistics then differ
+    from exec_data, which always rescans.
+    """
+    def __init__(self, bad_chan, max_channel_id=10, crc_cache=0, crc_sample=1, resync_probe=0):
+        self.bad_chan = bad_chan                # dead reckoning clamp for bad channel IDs
+        self.max_channel_id = max_channel_id
+        self.crc32 = cached_crc32_frame(crc_cache) if crc_cache > 0 else crc32_frame
+        self.crc_sample = crc_sample
+        self.crc_checked = [0, 0]
+        self.crc_mismatches = [0, 0]
+        self._skip = 0                          # OK frames left before the next sampled one
+        self._verify_next = True
+        self.counting = False
+        self.resync_probe = resync_probe
+        self.resyncs = [0, 0]
+        self.batch_crc = np is not None
+        self.ChStat = [[0] * 11 for n in range(4)]
+        self.errors = ErrorBatch()
+
+    def decode(self, buf, dbg=False):
+        ChStat = self.ChStat
+        for row in ChStat:
+            row[:] = (0,) * 11
+        self.errors.clear()
+        n_words = len(buf) // 4
+        mv = memoryview(buf)
+
+        s = 0  # word index of the next frame
+        while s + FRAME_WORDS <= n_words:
+            if s and self.resync_probe:
+                # after an alignment loss: lock on the best frame phase if one scores
+                p = self._phase_lock(buf, s, n_words)
+                if p >= 0:
+                    dead_reckon(buf, s + 1, p, ChStat, self.bad_chan, dbg)
+                    self._verify_next = True
+                    s, lost = self._decode_aligned(buf, mv, p, n_words, dbg)
+                    if not lost:
+                        break
+                    continue
+            # Not aligned: the frame at s itself is not tested, the search starts one word later
+            if dbg and s + 8 < 200:
+                word, = struct.unpack_from('>I', buf, (s + CHAN_WORD) * 4)
+                print(f"Not aligned chan={word >> CHAN_SHIFT & CHAN_MASK}  Rawdata={int.from_bytes(buf[s * 4:s * 4 + 32], 'big'):x}")
+            found = find_filler(buf, s + 1)
+            dead_reckon(buf, s + 1, found if found >= 0 else n_words - 7, ChStat, self.bad_chan, dbg)
+            if found < 0:
+                if s + FRAME_WORDS == n_words and buf[s * 4:] == FILLER_FRAME:
+                    ChStat[2][9] += 1
+                break
+            if s == 0 and is_all_filler(buf, found):
+                ChStat[2][9] += (n_words - found) // FRAME_WORDS
+                break
+            ChStat[2][9] += 1
+            self._verify_next = True
+            s, lost = self._decode_aligned(buf, mv, found + FRAME_WORDS, n_words, dbg)
+            if not lost:
+                break
+        return ChStat, self.errors
+
+    def _batching(self):
+        """True if long aligned runs take their CRCs from batch_crc_tables."""
+        return self.batch_crc and self.crc32 is crc32_frame and self.crc_sample == 1 and not self.counting
+
+    def _phase_lock(self, buf, start, n_words):
+        """Word index of the best scoring frame phase in start..start+7, -1 if none scores."""
+        best, best_score = -1, 0
+        max_channel_id = self.max_channel_id
+        for p in range(start, min(start + FRAME_WORDS, n_words - FRAME_WORDS + 1)):
+            score = 0
+            for q in range(p, min(p + self.resync_probe * FRAME_WORDS, n_words - FRAME_WORDS + 1), FRAME_WORDS):
+                words = FRAME_STRUCT.unpack_from(buf, q * 4)
+                if words == FILLER_WORDS:
+                    score += 1
+                elif ((words[CHAN_WORD] >> CHAN_SHIFT & CHAN_MASK) < max_channel_id
+                      and self.crc32(buf[q * 4:q * 4 + PAYLOAD_BYTES]) == words[CRC_WORD] >> CRC_SHIFT & CRC_MASK):
+                    score += 1
+            if score > best_score:
+                best, best_score = p, score
+        self.resyncs[best < 0] += 1
+        return best
+
+    def _decode_aligned(self, buf, mv, start, n_words, dbg):
+        """Walk aligned frames from word start.
+
+        Returns (s, lost): after an alignment loss s is the word index of the frame
+        following the bad one, otherwise s is where the trailing partial frame begins.
+        """
+        ok_stat = self.ChStat[2]
+        err_stat = self.ChStat[3]
+        errors = self.errors
+        max_channel_id = self.max_channel_id
+        crc32_frame = self.crc32
+        unpack_error = unpack_error_fields
+        err_word, err_shift, err_mask = ERR_WORD, ERR_SHIFT, ERR_MASK
+        chan_word, chan_shift, chan_mask = CHAN_WORD, CHAN_SHIFT, CHAN_MASK
+        crc_word, crc_shift, crc_mask = CRC_WORD, CRC_SHIFT, CRC_MASK
+        sample = self.crc_sample
+        skip = self._skip
+        verify_next = self._verify_next
+        counting = self.counting
+        checked = self.crc_checked
+        mismatches = self.crc_mismatches
+        now = datetime.datetime.now
+        pos = start * 4
+        end = pos + (n_words - start) // FRAME_WORDS * FRAME_BYTES
+        # per-frame CRCs for the first BATCH_AFTER frames, then batched spans as long as the run so far
+        run_start = span_start = pos
+        span_end = min(end, pos + BATCH_AFTER * FRAME_BYTES) if self._batching() else end
+        crc_table = match_table = None
+        while True:
+            for words in FRAME_STRUCT.iter_unpack(mv[pos:span_end]):
+                if words[err_word] >> err_shift & err_mask:
+                    if counting:
+                        # counting-only: no CRC, no record
+                        channel_id = words[chan_word] >> chan_shift & chan_mask
+                    else:
+                        # aligned error frame, always recorded
+                        (channel_id, inject_error, error_counter, time_stamp, expected_code, received_code,
+                         error_position, crc32) = unpack_error(*words)
+                        if crc_table is not None:
+                            cal_crc32 = crc_table[(pos - span_start) >> 5]
+                        else:
+                            cal_crc32 = crc32_frame(buf[pos:pos + PAYLOAD_BYTES])
+                        errors.append(ErrorRecord(now(), channel_id, inject_error, error_counter, cal_crc32 - crc32, time_stamp,
+                                                  expected_code, received_code, error_position, crc32))
+                    if channel_id < max_channel_id:
+                        err_stat[channel_id] += 1
+                    else:
+                        if dbg: print(f"Bad channel_id {channel_id}")
+                        err_stat[10] += 1
+                    verify_next = True
+                elif words == FILLER_WORDS:
+                    ok_stat[9] += 1
+                else:
+                    channel_id = words[chan_word] >> chan_shift & chan_mask
+                    if skip and not verify_next and channel_id < max_channel_id:
+                        # not sampled, counted on the channel ID alone
+                        skip -= 1
+                        ok_stat[channel_id] += 1
+                    elif counting and channel_id < max_channel_id:
+                        ok_stat[channel_id] += 1
+                    elif channel_id < max_channel_id and (match_table[(pos - span_start) >> 5] if match_table is not None
+                                                          else crc32_frame(buf[pos:pos + PAYLOAD_BYTES])
+                                                          == words[crc_word] >> crc_shift & crc_mask):
+                        ok_stat[channel_id] += 1
+                        checked[verify_next] += 1
+                        skip = sample - 1
+                        verify_next = False
+                    else:
+                        if channel_id < max_channel_id:
+                            checked[verify_next] += 1
+                            mismatches[verify_next] += 1
+                        ok_stat[10] += 1
+                        if dbg: print(f"Line 407, ALignment loss Rawdata is {int.from_bytes(mv[pos:pos + FRAME_BYTES], 'big'):x}")
+                        self._skip = 0
+                        return pos // 4 + FRAME_WORDS, True
+                pos += FRAME_BYTES
+            if span_end == end:
+                break
+            span_start = span_end
+            span_end = min(end, span_end + (span_end - run_start))
+            crc_table, match_table = batch_crc_tables(buf, span_start, (span_end - span_start) // FRAME_BYTES)
+        self._skip = skip
+        self._verify_next = verify_next
+        return pos // 4, False
+
+
+# ------------------------------------------------------------------#
+class StreamDecoder(FrameDecoder):
+    """Decoder for continuous readout: successive FIFO buffers form one unbroken stream.
+
+    Alignment state, the partial trailing frame (or the not yet searched tail while
+    not aligned) and the counters are carried from one feed to the next, so frames
+    straddling two buffers are decoded and no buffer pays a fresh realignment. The
+    decision rules are those of exec_data applied to the stream as a whole: the first
+    frame of the stream and the frame after an alignment loss are not tested for
+    filler, and dead reckoning counts windows at stream word index % 8 == 1. With
+    resync_probe the phase lock after a loss waits until the stream holds the probe
+    frames of every phase, so it does not depend on where the buffers are split.
+
+    feed(buf) returns the events of that buffer in stream order:
+        ('aligned', word, None)   filler frame at stream word index `word` locked alignment
+                                  (with resync_probe: or the frame phase picked after a loss)
+        ('loss', word, None)      frame at `word` broke alignment
+        ('error', word, record)   aligned error frame, record an ErrorRecord (not in counting mode)
+    ChStat holds the counts of the frames completed by the last feed, totals the
+    running counts of the whole stream.
+    """
+    def __init__(self, bad_chan, max_channel_id=10, crc_cache=0, crc_sample=1, resync_probe=0):
+        FrameDecoder.__init__(self, bad_chan, max_channel_id, crc_cache, crc_sample, resync_probe)
+        self.reset()
+
+    def reset(self):
+        """Start a new stream: no alignment, no carried words, zero totals."""
+        self.totals = [[0] * 11 for n in range(4)]
+        self._tail = b''
+        self._base = 0          # stream word index of the first word of _tail
+        self._pos = 1           # next frame (aligned) or next window to test, relative to _tail
+        self._aligned = False
+        self._locking = False   # _pos is the frame after a loss, to phase lock from
+        self._skip = 0
+        self._verify_next = True
+
+    def feed(self, buf, dbg=False):
+        ChStat = self.ChStat
+        for row in ChStat:
+            row[:] = (0,) * 11
+        self.errors.clear()
+        events = []
+        data = self._tail + buf if self._tail else bytes(buf)
+        base = self._base
+        n_words = len(data) // 4
+        mv = memoryview(data)
+        p = self._pos
+
+        while True:
+            if self._aligned:
+                first_error = len(self.errors)
+                s, lost = self._decode_aligned(data, mv, p, n_words, dbg)
+                if not self.counting:
+                    events.extend(('error', base + word, record) for word, record in self._error_words(data, p, s, first_error))
+                if not lost:
+                    p = s
+                    break
+                events.append(('loss', base + s - FRAME_WORDS, None))
+                self._aligned = False
+                self._locking = self.resync_probe > 0
+                p = s if self._locking else s + 1   # the frame after the bad one is not tested
+            if self._locking:
+                if n_words - p < self.resync_probe * FRAME_WORDS + 7:
+                    break       # carried until every phase can be probed
+                self._locking = False
+                lock = self._phase_lock(data, p, n_words)
+                p += 1
+                if lock >= 0:
+                    dead_reckon(data, p, lock, ChStat, self.bad_chan, dbg, base)
+                    events.append(('aligned', base + lock, None))
+                    self._aligned = True
+                    self._verify_next = True
+                    p = lock
+                    continue
+            found = find_filler(data, p)
+            end = found if found >= 0 else max(p, n_words - 7)
+            dead_reckon(data, p, end, ChStat, self.bad_chan, dbg, base)
+            if found < 0:
+                p = end
+                break
+            ChStat[2][9] += 1
+            events.append(('aligned', base + found, None))
+            self._aligned = True
+            self._verify_next = True
+            p = found + FRAME_WORDS
+
+        # keep the unfinished frame / window for the next buffer
+        keep = min(p, n_words)
+        self._tail = data[keep * 4:]
+        self._base = base + keep
+        self._pos = p - keep
+        for total, row in zip(self.totals, ChStat):
+            for m in range(11):
+                total[m] += row[m]
+        return events
+
+    def _error_words(self, data, start, stop, first_error):
+        """Pair the error records of an aligned segment with their frame word index."""
+        records = iter(self.errors[first_error:])
+        for pos in range(start * 4, stop * 4, FRAME_BYTES):
+            word, = struct.unpack_from('>I', data, pos + ERR_WORD * 4)
+            if word >> ERR_SHIFT & ERR_MASK:
+                yield pos // 4, next(records)
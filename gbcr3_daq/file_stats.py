@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Machine-readable per-file statistics: FileStats.csv next to Filesummary.TXT.
+
+Filesummary.TXT holds 11 text lines per file. FileStats.csv holds the same numbers
+as one comma-separated row of FILE_STATS_COLUMNS per file: the file number, the
+summarize_file file_stats counters, the total frame count and the 18 per-channel
+aligned OK / Err counters. The first line names the columns, so a run, or
+several runs one after the other, loads in one call:
+
+    stats = load_file_stats('QAResults_v2/<run>/FileStats.csv')
+    stats['aligned_err'].sum(), stats['ch4_err']
+    scan = load_file_stats(*glob.glob('QAResults_v2/*/FileStats.csv'))
+'''
+import atexit
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUM_CHANNELS = 9
+FILE_STATS_COLUMNS = (
+    ('file_number', 'filler', 'aligned_ok', 'aligned_err', 'not_aligned_err', 'not_aligned_ok',
+     'alignment_loss', 'bad_channel_id', 'no_data', 'total_frames')
+    + tuple(f'ch{i}_ok' for i in range(NUM_CHANNELS))
+    + tuple(f'ch{i}_err' for i in range(NUM_CHANNELS))
+)
+FILE_STATS_HEADER = ','.join(FILE_STATS_COLUMNS) + '\n'
+FILE_STATS_DTYPE = np.dtype([(name, '<i8') for name in FILE_STATS_COLUMNS]) if np is not None else None
+
+
+# ------------------------------------------------------------------#
+class FileStatsStream(object):
+    """Buffered append-only writer of FileStats.csv; until open() it writes nothing."""
+    def __init__(self, buffering=1 << 16):
+        self.path = None
+        self.buffering = buffering
+        self._handle = None
+        atexit.register(self.close)
+
+    def open(self, path):
+        self.close()
+        self.path = path
+        self._handle = open(path, 'a', buffering=self.buffering)
+        if self._handle.tell() == 0:
+            self._handle.write(FILE_STATS_HEADER)
+
+    def append(self, file_number, file_stats, current_channel_stats, total_frames):
+        """One row: file_stats[1:] (file_stats[0] is the file count, always 1) and the channel counters."""
+        if self._handle is None:
+            return
+        row = [file_number, *file_stats[1:], total_frames, *current_channel_stats]
+        self._handle.write(','.join(map(str, row)) + '\n')
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self.path = None
+
+
+# ------------------------------------------------------------------#
+def load_file_stats(*paths):
+    """Structured NumPy array of FILE_STATS_DTYPE rows of one or more FileStats.csv, in the order given."""
+    if np is None:
+        raise ImportError("load_file_stats needs NumPy")
+    arrays = []
+    for path in paths:
+        with open(path) as in_file:
+            if in_file.readline() != FILE_STATS_HEADER:
+                raise ValueError(f"{path} does not have the FILE_STATS_COLUMNS header")
+        arrays.append(np.loadtxt(path, dtype=FILE_STATS_DTYPE, delimiter=',', skiprows=1, ndmin=1))
+    return np.concatenate(arrays) if arrays else np.zeros(0, dtype=FILE_STATS_DTYPE)
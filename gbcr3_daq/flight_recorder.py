@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Flight recorder of raw FIFO buffers.
+
+The byte image of the last `depth` buffers is kept in a ring. When a decoded
+buffer shows an anomaly (alignment loss ChStat[2][10], a bad channel ID on an
+error frame ChStat[3][10], or an error frame whose CRC does not match) the ring is
+dumped to FlightRecorder/ in the run directory by a background thread, so the
+readout loop does not wait for the disk. Every buffer is written once as
+File{N}.raw, big-endian 32-bit words as read from the FIFO (the format
+decoder_check.py --recorded reads), and every trigger adds a line to
+FlightRecorder/index.TXT.
+'''
+import os
+import queue
+import datetime
+import threading
+import collections
+
+
+# ------------------------------------------------------------------#
+class FlightRecorder(object):
+    """Ring of the last `depth` raw buffers; depth 0 records nothing.
+
+    record(file_number, buf) adds a buffer, check(...) triggers a dump when the
+    decoded statistics show an anomaly. At most max_dumps triggers are written per
+    run; close() waits for the pending dumps.
+    """
+    def __init__(self, depth=0, max_dumps=100):
+        self.depth = depth
+        self.max_dumps = max_dumps
+        self.dumps = 0
+        self._written = set()
+        self._queue = None
+        self._thread = None
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @depth.setter
+    def depth(self, depth):
+        self._depth = depth
+        self._ring = collections.deque(maxlen=depth or None)
+
+    def record(self, file_number, buf):
+        if self._depth:
+            self._ring.append((file_number, bytes(buf)))
+
+    def check(self, ChStat, crc_errors, store_dict, file_number):
+        """Dump the ring if ChStat of file_number or its crc_errors (count of error frames
+        with a CRC mismatch) show an anomaly; returns the list of reasons."""
+        if not self._depth:
+            return []
+        reasons = []
+        if ChStat[2][10]:
+            reasons.append(f"alignment loss {ChStat[2][10]}")
+        if ChStat[3][10]:
+            reasons.append(f"bad channel ID {ChStat[3][10]}")
+        if crc_errors:
+            reasons.append(f"CRC mismatch {crc_errors}")
+        if reasons and self.dumps < self.max_dumps:
+            self.dumps += 1
+            self.trigger(store_dict, file_number, reasons)
+        return reasons
+
+    def trigger(self, store_dict, file_number, reasons):
+        """Queue the buffers of the ring not written yet for the background writer."""
+        buffers = [(number, buf) for number, buf in self._ring if number not in self._written]
+        self._written = {number for number, buf in self._ring}
+        if self._thread is None:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._writer, name='flight_recorder', daemon=True)
+            self._thread.start()
+        self._queue.put((f"./{store_dict}/FlightRecorder", datetime.datetime.now(), file_number, reasons, buffers))
+
+    def _writer(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            directory, time, file_number, reasons, buffers = job
+            os.makedirs(directory, exist_ok=True)
+            for number, buf in buffers:
+                with open(os.path.join(directory, f"File{number}.raw"), 'wb') as outfile:
+                    outfile.write(buf)
+            with open(os.path.join(directory, 'index.TXT'), 'a') as infile:
+                infile.write(f"{time} file {file_number} {', '.join(reasons)}: "
+                             f"{' '.join(f'File{number}.raw' for number, buf in buffers) or 'already written'}\n")
+
+    def close(self):
+        """Write out the pending dumps."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Declarative layout of the GBCR3 256-bit data frame.
+
+A frame is 8 big-endian 32-bit words as read from the FIFO. Every field is given by
+the word holding its most significant bit, the position of that bit in the word
+(31 = word MSB, 0 = word LSB) and its width; a field may run on into the following
+words. FrameLayout compiles such a spec into extractors:
+
+    unpack = FRAME_LAYOUT.compile(('channel_id', 'crc32'))
+    channel_id, crc32 = unpack(w0, w1, w2, w3, w4, w5, w6, w7)
+
+builds a plain Python function of shifts and masks on the 8 words (no 256-bit
+integer), and FRAME_LAYOUT.columns(frames) extracts whole fields from an (n, 8)
+uint32 array with NumPy, falling back to the compiled function without it. A
+firmware layout change is an edit of GBCR3_FRAME_FIELDS only.
+'''
+try:
+    import numpy as np
+except ImportError:         # NumPy is optional, columns() then works on lists
+    np = None
+
+FRAME_WORDS = 8
+WORD_BITS = 32
+
+# field name           word   msb bit   width
+GBCR3_FRAME_FIELDS = (
+    ('error_flag',        0,     31,      1),
+    ('channel_id',        0,     30,      4),
+    ('time_stamp',        0,     26,     48),
+    ('inject_error',      1,     10,     16),
+    ('expected_code',     2,     26,     32),
+    ('received_code',     3,     26,     32),
+    ('error_position',    4,     26,     32),
+    ('error_counter',     5,     26,     59),
+    ('crc32',             7,     31,     32),
+)
+
+# fields written for an error frame, in ChAll.TXT column order (crc_diff aside)
+ERROR_FIELDS = ('channel_id', 'inject_error', 'error_counter', 'time_stamp',
+                'expected_code', 'received_code', 'error_position', 'crc32')
+
+
+# ------------------------------------------------------------------#
+def field_parts(word, msb, width):
+    """Split a field into (word, shift, mask, left_shift) pieces, most significant first.
+
+    The field value is the OR of ((w[word] >> shift) & mask) << left_shift over the pieces.
+    """
+    if not (0 <= word < FRAME_WORDS and 0 <= msb < WORD_BITS and width > 0):
+        raise ValueError(f"bad field position word={word} msb={msb} width={width}")
+    parts = []
+    left = width
+    avail = msb + 1                 # bits of the field available in the current word
+    while left > 0:
+        if word >= FRAME_WORDS:
+            raise ValueError("field runs past the end of the frame")
+        take = min(avail, left)
+        left -= take
+        parts.append((word, avail - take, (1 << take) - 1, left))
+        word += 1
+        avail = WORD_BITS
+    return parts
+
+
+def _part_expr(word, shift, mask, left_shift):
+    expr = f"w{word}"
+    if shift:
+        expr = f"{expr} >> {shift}"
+    if mask != 0xffff_ffff >> shift:
+        expr = f"{expr} & 0x{mask:x}"
+    if left_shift:
+        expr = f"({expr}) << {left_shift}"
+    return expr
+
+
+class FrameLayout(object):
+    """Compiled field extractors for a frame spec of (name, word, msb, width) rows."""
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.names = tuple(name for name, word, msb, width in self.fields)
+        self._parts = {name: field_parts(word, msb, width) for name, word, msb, width in self.fields}
+        self._compiled = {}
+
+    def expression(self, name):
+        """Python expression of the field in terms of the words w0..w7."""
+        return " | ".join(_part_expr(*part) for part in self._parts[name])
+
+    def word_field(self, name):
+        """(word, shift, mask) of a field contained in a single word."""
+        parts = self._parts[name]
+        if len(parts) != 1:
+            raise ValueError(f"field {name} spans {len(parts)} words")
+        word, shift, mask, left_shift = parts[0]
+        return word, shift, mask
+
+    def compile(self, names=None):
+        """Function of the 8 frame words returning the named fields (all by default) as a tuple."""
+        names = self.names if names is None else tuple(names)
+        unpack = self._compiled.get(names)
+        if unpack is None:
+            args = ", ".join(f"w{k}" for k in range(FRAME_WORDS))
+            body = ", ".join(self.expression(name) for name in names)
+            namespace = {}
+            exec(f"def unpack({args}):\n    return ({body},)\n", namespace)
+            unpack = self._compiled[names] = namespace['unpack']
+        return unpack
+
+    def columns(self, frames, names=None):
+        """Dict of field name to column for a batch of frames.
+
+        frames is an (n, 8) uint32 array with NumPy (columns are uint64 arrays) or a
+        sequence of 8-word sequences without it (columns are lists).
+        """
+        names = self.names if names is None else tuple(names)
+        if np is None:
+            rows = list(zip(*(self.compile(names)(*words) for words in frames)))
+            return {name: list(rows[k]) if rows else [] for k, name in enumerate(names)}
+        frames = np.asarray(frames, dtype=np.uint32).reshape(-1, FRAME_WORDS)
+        columns = {}
+        for name in names:
+            value = np.zeros(len(frames), dtype=np.uint64)
+            for word, shift, mask, left_shift in self._parts[name]:
+                piece = (frames[:, word].astype(np.uint64) >> np.uint64(shift)) & np.uint64(mask)
+                value |= piece << np.uint64(left_shift)
+            columns[name] = value
+        return columns
+
+
+FRAME_LAYOUT = FrameLayout(GBCR3_FRAME_FIELDS)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+I2C access to the GBCR3 board through the FPGA command interface.
+
+The entry point opens the socket, builds its command_interpret instance and hands
+it over with attach() before the first iic_write / iic_read / Current_monitor call.
+'''
+import time
+
+cmd_interpret = None    # command_interpret instance of the FPGA link, see attach()
+
+
+def attach(interface):
+    """Route the I2C helpers through this command_interpret instance."""
+    global cmd_interpret
+    cmd_interpret = interface
+
+
+# ---------------------------------------------------------------------------------------------#
+## Current_Monitor
+def Current_monitor():
+    I2C_Addr = 0x9e >> 1  # I2C address of first LTC2991, note that
+
+    # iic_write(1, I2C_Addr, 0, 0x06, 0x99)       # V1-V2 differential, Filter enabled, V3-V4 differential, Filter enabled
+    iic_write(1, I2C_Addr, 0, 0x06, 0x11)  # V1-V2 differential, Filter enabled, V3-V4 differential, Filter enabled
+    # print(iic_read(0, I2C_Addr, 1, 0x06))       # read back control register
+
+    iic_write(1, I2C_Addr, 0, 0x01, 0x38)  # V1-V2 and V3-V4 enabled, VCC and T internal enabled
+
+    # print(hex(iic_read(0, I2C_Addr, 1, 0x00)))  # status low 
+    # print(hex(iic_read(0, I2C_Addr, 1, 0x01)))  # status high
+    V12_Volt = 0
+    I12 = 0
+    V12_MSB = iic_read(0, I2C_Addr, 1, 0x0C)  # V1-V2 MSB
+    V12_LSB = iic_read(0, I2C_Addr, 1, 0x0D)  # V1-V2 LSB
+    V12_Valid = (V12_MSB & 0x80) >> 7
+    V12_Sign = (V12_MSB & 0x40) >> 6
+    if V12_Sign == 0:
+        V12_Volt = ((V12_MSB & 0x3f) << 8 | V12_LSB) * 19.075 * 1E-6
+    I12 = 982.5 * V12_Volt - 10.489
+    # print("V1-V2 volt: %.3f V, I12：%.3f mA"%(V12_Volt, I12))
+
+    V34_Volt = 0
+    I34 = 0
+    V34_MSB = iic_read(0, I2C_Addr, 1, 0x10)  # V3-V4 MSB
+    V34_LSB = iic_read(0, I2C_Addr, 1, 0x11)  # V3-V4 LSB
+    V34_Valid = (V34_MSB & 0x80) >> 7
+    V34_Sign = (V34_MSB & 0x40) >> 6
+    if V34_Sign == 0:
+        V34_Volt = ((V34_MSB & 0x3f) << 8 | V34_LSB) * 19.075 * 1E-6
+    I34 = 949.0 * V34_Volt + 0.0258
+    # print("V3-V4 volt: %.3f V, I34：%.3f mA"%(V34_Volt, I34))
+
+    VCC_MSB = iic_read(0, I2C_Addr, 1, 0x1C)  # VCC MSB
+    VCC_LSB = iic_read(0, I2C_Addr, 1, 0x1D)  # VCC LSB
+
+    VCC_Volt = ((VCC_MSB & 0x3f) << 8 | VCC_LSB) * 0.00030518 + 2.5
+    # print("VCC volt: %.3f"%VCC_Volt)
+    return [I12, I34]
+
+
+# ---------------------------------------------------------------------------------------------#
+
+# ---------------------------------------------------------------------------------------------#
+# # IIC write slave device
+# @param mode[1:0] : '0'is 1 bytes read or wirte, '1' is 2 bytes read or write, '2' is 3 bytes read or write
+# @param slave[7:0] : slave device address
+# @param wr: 1-bit '0' is write, '1' is read
+# @param reg_addr[7:0] : register address
+# @param data[7:0] : 8-bit write data
+def iic_write(mode, slave_addr, wr, reg_addr, data):
+    val = mode << 24 | slave_addr << 17 | wr << 16 | reg_addr << 8 | data
+    cmd_interpret.write_config_reg(4, 0xffff & val)
+    cmd_interpret.write_config_reg(5, 0xffff & (val >> 16))
+    time.sleep(0.1)
+    cmd_interpret.write_pulse_reg(0x0001)  # reset ddr3 data fifo
+    time.sleep(0.1)
+
+
+# ---------------------------------------------------------------------------------------------#
+
+
+# ---------------------------------------------------------------------------------------------#
+## IIC read slave device
+# @param mode[1:0] : '0'is 1 bytes read or wirte, '1' is 2 bytes read or write, '2' is 3 bytes read or write
+# @param slave[6:0]: slave device address
+# @param wr: 1-bit '0' is write, '1' is read
+# @param reg_addr[7:0] : register address
+def iic_read(mode, slave_addr, wr, reg_addr):
+    val = mode << 24 | slave_addr << 17 | 0 << 16 | reg_addr << 8 | 0x00  # write device addr and reg addr
+    cmd_interpret.write_config_reg(4, 0xffff & val)
+    cmd_interpret.write_config_reg(5, 0xffff & (val >> 16))
+    time.sleep(0.01)
+    cmd_interpret.write_pulse_reg(0x0001)  # Sent a pulse to IIC module
+
+    val = mode << 24 | slave_addr << 17 | wr << 16 | reg_addr << 8 | 0x00  # write device addr and read one byte
+    cmd_interpret.write_config_reg(4, 0xffff & val)
+    cmd_interpret.write_config_reg(5, 0xffff & (val >> 16))
+    time.sleep(0.01)
+    cmd_interpret.write_pulse_reg(0x0001)  # Sent a pulse to IIC module
+    time.sleep(0.1)  # delay 10ns then to read data
+    return cmd_interpret.read_status_reg(0) & 0xff
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Process-pool decode stage for GBCR3 FIFO buffers.
+
+The socket reader hands the byte image of every buffer to ParallelDecoder, which
+decodes it with FrameDecoder in one of a set of persistent worker processes. The
+workers import fifo_decoder (and with it the CRC tables) once at start-up and keep
+one FrameDecoder each. Results come back strictly in submission order, so writing
+them out gives the same Filesummary.TXT and per-channel totals as decoding the
+buffers one after the other.
+'''
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+from .error_records import ErrorBatch
+from .fifo_decoder import FrameDecoder
+
+_worker_decoder = None
+
+
+def _init_worker(bad_chan, max_channel_id, crc_cache, resync_probe):
+    global _worker_decoder
+    _worker_decoder = FrameDecoder(bad_chan, max_channel_id, crc_cache, resync_probe=resync_probe)
+
+
+def _decode(buf, counting=False):
+    _worker_decoder.counting = counting
+    ChStat, errors = _worker_decoder.decode(buf)
+    return [row[:] for row in ChStat], ErrorBatch(errors)
+
+
+# ------------------------------------------------------------------#
+class ParallelDecoder(object):
+    """Ordered FrameDecoder stage backed by a ProcessPoolExecutor.
+
+    submit(tag, buf) queues a buffer; collect() returns (tag, ChStat, errors) for the
+    buffers that are finished, oldest first and never skipping an unfinished one.
+    At most max_pending buffers are in flight; beyond that collect() waits for the
+    oldest one, which keeps memory bounded when decoding falls behind.
+    """
+    def __init__(self, workers, bad_chan, max_channel_id=10, max_pending=None, crc_cache=0, resync_probe=0):
+        self.max_pending = max_pending or 2 * workers
+        self._pending = collections.deque()
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(bad_chan, max_channel_id, crc_cache, resync_probe))
+
+    def submit(self, tag, buf, counting=False):
+        """Queue a buffer; counting=True decodes it in the counting-only mode of FrameDecoder."""
+        self._pending.append((tag, self._pool.submit(_decode, buf, counting)))
+
+    def pending(self):
+        return len(self._pending)
+
+    def collect(self, wait=False):
+        """Results of finished buffers in submission order; wait=True drains everything."""
+        results = []
+        while self._pending:
+            tag, future = self._pending[0]
+            if not (wait or future.done() or len(self._pending) > self.max_pending):
+                break
+            ChStat, errors = future.result()
+            self._pending.popleft()
+            results.append((tag, ChStat, errors))
+        return results
+
+    def close(self):
+        for tag, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
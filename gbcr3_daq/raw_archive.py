@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Compressed, seekable archive of raw FIFO buffers.
+
+Raw data is mostly repeated filler frames, so it compresses very well. Raw.arc is
+a HEADER_BYTES header (magic b'GBCR3ARC', version, codec) followed by chunks, each
+the zlib or lzma compression of `chunk_buffers` consecutive buffers (big-endian
+32-bit words, as in Raw.bin) compressed on its own. Raw.aix is the offset index: a
+HEADER_BYTES header and one fixed-width row of ARCHIVE_INDEX_COLUMNS per buffer,
+telling which chunk holds it (byte offset and size in Raw.arc) and where in the
+decompressed chunk it starts. Reading file N decompresses only its chunk.
+
+RawArchive compresses and writes on a background thread, so the readout loop only
+copies the buffer; RawArchiveReader has the interface of RawCaptureReader and
+open_capture picks the reader a path needs. Convert an existing capture with
+
+    python -m gbcr3_daq.raw_archive QAResults_v2/<run>/Raw.bin [zlib|lzma]
+'''
+import os
+import sys
+import lzma
+import zlib
+import queue
+import struct
+import atexit
+import datetime
+import threading
+
+from .fifo_decoder import fifo_to_bytes
+from .raw_capture import EPOCH, MICROSECOND, RAW_MAGIC, RawCaptureReader
+
+ARCHIVE_MAGIC = b'GBCR3ARC'
+ARCHIVE_INDEX_MAGIC = b'GBCR3AIX'
+VERSION = 1
+HEADER_BYTES = 128
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+ARCHIVE_INDEX_COLUMNS = (
+    ('file_number', '<u4'),
+    ('time', '<M8[us]'),            # host time after the readout
+    ('words', '<u4'),
+    ('chunk_offset', '<u8'),        # byte offset of the compressed chunk in Raw.arc
+    ('chunk_bytes', '<u4'),         # compressed size of the chunk
+    ('offset', '<u4'),              # byte offset of the buffer in the decompressed chunk
+)
+ARCHIVE_INDEX_STRUCT = struct.Struct('<IqIQII')
+
+
+def _header(magic, text):
+    return (magic + struct.pack('<H', VERSION) + text.encode('ascii')).ljust(HEADER_BYTES, b'\0')
+
+
+def archive_header(codec):
+    return _header(ARCHIVE_MAGIC, codec)
+
+
+ARCHIVE_INDEX_HEADER = _header(ARCHIVE_INDEX_MAGIC, ','.join(f"{name}:{kind}" for name, kind in ARCHIVE_INDEX_COLUMNS))
+
+
+# ------------------------------------------------------------------#
+class RawArchive(object):
+    """Append-only writer of Raw.arc / Raw.aix in a run directory.
+
+    append() collects buffers into the current chunk; a full chunk is handed to the
+    compression thread through a queue of at most max_queued chunks (append waits
+    only if compression falls that far behind). close() writes the last, partial
+    chunk and waits for the thread. An error in the thread (a full disk, say) is
+    kept; the thread goes on draining the queue, append() raises it from then on
+    and close() raises it unless append() already did.
+    """
+    def __init__(self, directory, codec='zlib', chunk_buffers=16, max_queued=8):
+        self.archive_path = os.path.join(directory, 'Raw.arc')
+        self.index_path = os.path.join(directory, 'Raw.aix')
+        self.codec = codec
+        self.chunk_buffers = chunk_buffers
+        self.buffers = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._compress = CODECS[codec][0]
+        self._archive = open(self.archive_path, 'ab')
+        self._index = open(self.index_path, 'ab')
+        if self._archive.tell() == 0:
+            self._archive.write(archive_header(codec))
+        elif self._read_codec() != codec:
+            raise ValueError(f"{self.archive_path} holds {self._read_codec()} chunks, not {codec}")
+        if self._index.tell() == 0:
+            self._index.write(ARCHIVE_INDEX_HEADER)
+        self._chunk = []
+        self._error = None
+        self._error_raised = False
+        self._queue = queue.Queue(max_queued)
+        self._thread = threading.Thread(target=self._writer, name='raw_archive', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _read_codec(self):
+        with open(self.archive_path, 'rb') as in_file:
+            return in_file.read(HEADER_BYTES)[10:].rstrip(b'\0').decode('ascii')
+
+    def append(self, file_number, mem_data, time=None):
+        """Store one FIFO buffer (the read_data_fifo word list, or its byte image)."""
+        self._raise_error()
+        buf = bytes(mem_data) if isinstance(mem_data, (bytes, bytearray)) else fifo_to_bytes(mem_data)
+        time = datetime.datetime.now() if time is None else time
+        self._chunk.append((file_number, (time - EPOCH) // MICROSECOND, buf))
+        self.buffers += 1
+        if len(self._chunk) >= self.chunk_buffers:
+            self._queue.put(self._chunk)
+            self._chunk = []
+
+    def _writer(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is not None:
+                # keep draining, so that append() and close() never block on a dead thread
+                continue
+            try:
+                self._write_chunk(chunk)
+            except Exception as error:
+                self._error = error
+
+    def _write_chunk(self, chunk):
+        data = b''.join(buf for number, time, buf in chunk)
+        compressed = self._compress(data)
+        chunk_offset = self._archive.tell()
+        self._archive.write(compressed)
+        self._archive.flush()
+        rows = []
+        offset = 0
+        for number, time, buf in chunk:
+            rows.append(ARCHIVE_INDEX_STRUCT.pack(number, time, len(buf) // 4, chunk_offset, len(compressed), offset))
+            offset += len(buf)
+        self._index.write(b''.join(rows))
+        self._index.flush()
+        self.raw_bytes += len(data)
+        self.compressed_bytes += len(compressed)
+
+    def _raise_error(self):
+        if self._error is not None:
+            self._error_raised = True
+            raise RuntimeError(f"writing {self.archive_path} failed: {self._error}") from self._error
+
+    def close(self):
+        if self._thread is None:
+            return
+        if self._chunk:
+            self._queue.put(self._chunk)
+            self._chunk = []
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._archive.close()
+        self._index.close()
+        if not self._error_raised:
+            self._raise_error()
+
+    def report(self):
+        ratio = self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+        return (f"Raw archive ({self.codec}): {self.buffers} buffers, {self.raw_bytes} bytes "
+                f"compressed to {self.compressed_bytes} ({ratio:.1f}x)")
+
+
+# ------------------------------------------------------------------#
+class RawArchiveReader(object):
+    """Random access to the buffers of a Raw.arc archive, same interface as RawCaptureReader.
+
+    The last decompressed chunk is kept, so reading the buffers in order
+    decompresses every chunk once.
+    """
+    def __init__(self, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, 'Raw.arc')
+        self.archive_path = path
+        self.index_path = os.path.splitext(path)[0] + '.aix'
+        with open(self.index_path, 'rb') as in_file:
+            if in_file.read(HEADER_BYTES) != ARCHIVE_INDEX_HEADER:
+                raise ValueError(f"{self.index_path} is not a version {VERSION} raw archive index")
+            data = in_file.read()
+        data = data[:len(data) // ARCHIVE_INDEX_STRUCT.size * ARCHIVE_INDEX_STRUCT.size]
+        rows = list(ARCHIVE_INDEX_STRUCT.iter_unpack(data))
+        self.index = [(number, EPOCH + time * MICROSECOND, words, chunk_offset)
+                      for number, time, words, chunk_offset, chunk_bytes, offset in rows]
+        self._chunks = [(chunk_offset, chunk_bytes, offset) for number, time, words, chunk_offset, chunk_bytes, offset in rows]
+        self._positions = {row[0]: k for k, row in enumerate(self.index)}
+        self._archive = open(path, 'rb')
+        header = self._archive.read(HEADER_BYTES)
+        self.codec = header[10:].rstrip(b'\0').decode('ascii')
+        if header != archive_header(self.codec) or self.codec not in CODECS:
+            raise ValueError(f"{path} is not a version {VERSION} raw archive")
+        self._decompress = CODECS[self.codec][1]
+        self._cached = (None, b'')
+
+    def __len__(self):
+        return len(self.index)
+
+    def position(self, file_number):
+        """Position in the archive of the buffer with that file number."""
+        return self._positions[file_number]
+
+    def buffer(self, k):
+        chunk_offset, chunk_bytes, offset = self._chunks[k]
+        if self._cached[0] != chunk_offset:
+            self._archive.seek(chunk_offset)
+            self._cached = (chunk_offset, self._decompress(self._archive.read(chunk_bytes)))
+        return self._cached[1][offset:offset + self.index[k][2] * 4]
+
+    def words(self, k):
+        buf = self.buffer(k)
+        return list(struct.unpack(f'>{len(buf) // 4}I', buf)) + [-1]
+
+    def __iter__(self):
+        for k in range(len(self.index)):
+            yield self.index[k][0], self.buffer(k)
+
+    def close(self):
+        self._archive.close()
+
+
+def open_capture(path):
+    """RawCaptureReader or RawArchiveReader for a Raw.bin, a Raw.arc or a run directory holding either."""
+    if os.path.isdir(path):
+        path = os.path.join(path, 'Raw.bin' if os.path.exists(os.path.join(path, 'Raw.bin')) else 'Raw.arc')
+    with open(path, 'rb') as in_file:
+        magic = in_file.read(len(RAW_MAGIC))
+    if magic == ARCHIVE_MAGIC:
+        return RawArchiveReader(path)
+    return RawCaptureReader(path)
+
+
+def archive_capture(path, codec='zlib', chunk_buffers=16):
+    """Write the Raw.arc / Raw.aix archive of the capture at path next to it; returns the RawArchive."""
+    capture = RawCaptureReader(path)
+    archive = RawArchive(os.path.dirname(os.path.abspath(capture.raw_path)), codec, chunk_buffers)
+    for k, (number, time, words, offset) in enumerate(capture.index):
+        archive.append(number, capture.buffer(k), time)
+    archive.close()
+    capture.close()
+    return archive
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m gbcr3_daq.raw_archive Raw.bin [zlib|lzma]")
+    print(archive_capture(sys.argv[1], *sys.argv[2:]).report())
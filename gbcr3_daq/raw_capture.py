@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Raw FIFO capture of a run: every buffer read_data_fifo returned, as read.
+
+Raw.bin is a HEADER_BYTES header (magic b'GBCR3RAW', version) followed by the
+buffers back to back as big-endian 32-bit words, the same words the flight
+recorder dumps and decoder_check.py --recorded reads. Raw.idx is a HEADER_BYTES
+header (magic b'GBCR3IDX', version, the column list) followed by one fixed-width
+little-endian row of INDEX_COLUMNS per buffer: file number, host time of the
+readout (microseconds since 1970-01-01, naive), word count and the byte offset of
+the buffer in Raw.bin. Both files are append-only and memory-mappable:
+
+    words = np.memmap('Raw.bin', dtype='>u4', mode='r', offset=HEADER_BYTES)
+
+RawCapture writes through large buffered sequential writes; RawCaptureReader
+reads a capture back by position or file number.
+'''
+import os
+import struct
+import atexit
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .fifo_decoder import fifo_to_bytes
+
+RAW_MAGIC = b'GBCR3RAW'
+INDEX_MAGIC = b'GBCR3IDX'
+VERSION = 1
+HEADER_BYTES = 64
+INDEX_COLUMNS = (
+    ('file_number', '<u4'),
+    ('time', '<M8[us]'),            # host time after the readout
+    ('words', '<u4'),
+    ('offset', '<u8'),              # byte offset of the buffer in Raw.bin
+)
+INDEX_STRUCT = struct.Struct('<IqIQ')
+INDEX_DTYPE = np.dtype(list(INDEX_COLUMNS)) if np is not None else None
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _header(magic, text=''):
+    return (magic + struct.pack('<H', VERSION) + text.encode('ascii')).ljust(HEADER_BYTES, b'\0')
+
+
+RAW_HEADER = _header(RAW_MAGIC, '>u4')
+INDEX_HEADER = _header(INDEX_MAGIC, ','.join(f"{name}:{kind}" for name, kind in INDEX_COLUMNS))
+
+
+# ------------------------------------------------------------------#
+class RawCapture(object):
+    """Append-only writer of Raw.bin / Raw.idx in a run directory."""
+    def __init__(self, directory, buffering=4 << 20):
+        self.raw_path = os.path.join(directory, 'Raw.bin')
+        self.index_path = os.path.join(directory, 'Raw.idx')
+        self._raw = open(self.raw_path, 'ab', buffering=buffering)
+        self._index = open(self.index_path, 'ab')
+        if self._raw.tell() == 0:
+            self._raw.write(RAW_HEADER)
+        if self._index.tell() == 0:
+            self._index.write(INDEX_HEADER)
+        self._offset = self._raw.tell()
+        self.buffers = 0
+        atexit.register(self.close)
+
+    def append(self, file_number, mem_data, time=None):
+        """Store one FIFO buffer (the read_data_fifo word list, or its byte image)."""
+        buf = mem_data if isinstance(mem_data, (bytes, bytearray)) else fifo_to_bytes(mem_data)
+        time = datetime.datetime.now() if time is None else time
+        self._raw.write(buf)
+        self._index.write(INDEX_STRUCT.pack(file_number, (time - EPOCH) // MICROSECOND, len(buf) // 4, self._offset))
+        self._offset += len(buf)
+        self.buffers += 1
+
+    def flush(self):
+        self._raw.flush()
+        self._index.flush()
+
+    def close(self):
+        if not self._raw.closed:
+            self._raw.close()
+            self._index.close()
+
+
+# ------------------------------------------------------------------#
+class RawCaptureReader(object):
+    """Random access to the buffers of a capture; path is Raw.bin or its directory.
+
+    index is the list of (file_number, time, words, offset) rows; buffer(k) is the
+    byte image of the k-th buffer, words(k) its word list with the -1 end marker as
+    exec_data takes it.
+    """
+    def __init__(self, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, 'Raw.bin')
+        self.raw_path = path
+        self.index_path = os.path.splitext(path)[0] + '.idx'
+        with open(self.index_path, 'rb') as in_file:
+            if in_file.read(HEADER_BYTES) != INDEX_HEADER:
+                raise ValueError(f"{self.index_path} is not a version {VERSION} raw capture index")
+            data = in_file.read()
+        data = data[:len(data) // INDEX_STRUCT.size * INDEX_STRUCT.size]
+        self.index = [(number, EPOCH + time * MICROSECOND, words, offset)
+                      for number, time, words, offset in INDEX_STRUCT.iter_unpack(data)]
+        self._positions = {row[0]: k for k, row in enumerate(self.index)}
+        self._raw = open(path, 'rb')
+        if self._raw.read(HEADER_BYTES) != RAW_HEADER:
+            raise ValueError(f"{path} is not a version {VERSION} raw capture")
+
+    def __len__(self):
+        return len(self.index)
+
+    def position(self, file_number):
+        """Position in the capture of the buffer with that file number."""
+        return self._positions[file_number]
+
+    def buffer(self, k):
+        number, time, words, offset = self.index[k]
+        self._raw.seek(offset)
+        return self._raw.read(words * 4)
+
+    def words(self, k):
+        buf = self.buffer(k)
+        return list(struct.unpack(f'>{len(buf) // 4}I', buf)) + [-1]
+
+    def __iter__(self):
+        for k in range(len(self.index)):
+            yield self.index[k][0], self.buffer(k)
+
+    def close(self):
+        self._raw.close()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+SQLite catalog of the runs in QAResults_v2.
+
+A main_v2.py --catalog run registers itself in QAResults_v2/catalog.sqlite:
+
+    runs       run directory, start / finish time, the CLI arguments (JSON) and
+               the run totals of Filesummary.TXT (NULL until the run finished)
+    registers  the full GBCR3_Config._regMap of the run, one (name, value) row
+               per register, indexed by (name, value)
+    files      one row of FILE_STATS_COLUMNS per file, as in FileStats.csv
+    channels   the final aligned OK / Err totals per channel
+
+The database runs in WAL mode, so a run can be analysed while the next one is
+writing. File rows are written in batched transactions of `batch_files` rows.
+Scan points are found through the register index, e.g. all RX4 retimed runs with
+clk_delay=0x8:
+
+    python -m gbcr3_daq.run_catalog QAResults_v2/catalog.sqlite CH4_Dis_MUX_BIAS=0xf CH4_CLK_Delay=0x8
+'''
+import sys
+import json
+import atexit
+import sqlite3
+import datetime
+
+from .file_stats import FILE_STATS_COLUMNS
+
+DEFAULT_PATH = 'QAResults_v2/catalog.sqlite'
+# run totals: the file count and the summed file_stats counters, as in write_run_totals
+RUN_TOTAL_COLUMNS = ('files',) + FILE_STATS_COLUMNS[1:10]
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    run_dir TEXT UNIQUE NOT NULL,
+    started TEXT NOT NULL,
+    finished TEXT,
+    args TEXT,
+    {', '.join(f'{name} INTEGER' for name in RUN_TOTAL_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+CREATE TABLE IF NOT EXISTS registers (
+    run_id INTEGER NOT NULL REFERENCES runs,
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS registers_value ON registers (name, value, run_id);
+CREATE TABLE IF NOT EXISTS files (
+    run_id INTEGER NOT NULL REFERENCES runs,
+    {', '.join(f'{name} INTEGER NOT NULL' for name in FILE_STATS_COLUMNS)},
+    PRIMARY KEY (run_id, file_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS channels (
+    run_id INTEGER NOT NULL REFERENCES runs,
+    channel INTEGER NOT NULL,
+    aligned_ok INTEGER NOT NULL,
+    aligned_err INTEGER NOT NULL,
+    PRIMARY KEY (run_id, channel)
+) WITHOUT ROWID;
+'''
+
+
+# ------------------------------------------------------------------#
+class RunCatalog(object):
+    """Connection to a run catalog; start_run, add_file and finish_run register one run."""
+    def __init__(self, path=DEFAULT_PATH, batch_files=100):
+        self.path = path
+        self.batch_files = batch_files
+        self.run_id = None
+        self._files = []
+        self._db = sqlite3.connect(path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        atexit.register(self.close)
+
+    def start_run(self, run_dir, reg_map, args=None):
+        """Register a run with its register map and CLI arguments (a dict); returns its run_id."""
+        with self._db:
+            cursor = self._db.execute('INSERT INTO runs (run_dir, started, args) VALUES (?, ?, ?)',
+                                      (run_dir, datetime.datetime.now().isoformat(sep=' '),
+                                       json.dumps(args, sort_keys=True, default=str)))
+            self.run_id = cursor.lastrowid
+            self._db.executemany('INSERT INTO registers VALUES (?, ?, ?)',
+                                 [(self.run_id, name, value) for name, value in reg_map.items()])
+        return self.run_id
+
+    def add_file(self, file_number, file_stats, current_channel_stats):
+        """Queue the row of one file (its summarize_file results); written every batch_files files."""
+        self._files.append((self.run_id, file_number, *file_stats[1:], sum(file_stats[1:8]), *current_channel_stats))
+        if len(self._files) >= self.batch_files:
+            self.flush()
+
+    def flush(self):
+        if self._files:
+            with self._db:
+                self._db.executemany(f'INSERT INTO files VALUES ({", ".join("?" * (len(FILE_STATS_COLUMNS) + 1))})',
+                                     self._files)
+            self._files = []
+
+    def finish_run(self, total_stats, single_ch_stats):
+        """Write the remaining file rows and the run totals (the write_run_totals arguments)."""
+        self.flush()
+        num_channels = len(single_ch_stats) // 2
+        with self._db:
+            self._db.execute(f'UPDATE runs SET finished = ?, {", ".join(f"{name} = ?" for name in RUN_TOTAL_COLUMNS)} '
+                             'WHERE run_id = ?',
+                             (datetime.datetime.now().isoformat(sep=' '), *total_stats, sum(total_stats[1:8]),
+                              self.run_id))
+            self._db.executemany('INSERT INTO channels VALUES (?, ?, ?, ?)',
+                                 [(self.run_id, channel, single_ch_stats[channel], single_ch_stats[num_channels + channel])
+                                  for channel in range(num_channels)])
+
+    def find_runs(self, **registers):
+        """The runs rows whose registers have all the given values, e.g. find_runs(CH4_CLK_Delay=0x8)."""
+        query = 'SELECT * FROM runs'
+        if registers:
+            query += ' WHERE run_id IN (' + ' INTERSECT '.join(
+                'SELECT run_id FROM registers WHERE name = ? AND value = ?' for name in registers) + ')'
+        parameters = [item for name, value in registers.items() for item in (name, value)]
+        return self._db.execute(query + ' ORDER BY started', parameters).fetchall()
+
+    def files(self, run_id):
+        """The files rows of a run, in file order."""
+        return self._db.execute('SELECT * FROM files WHERE run_id = ? ORDER BY file_number', (run_id,)).fetchall()
+
+    def channels(self, run_id):
+        return self._db.execute('SELECT * FROM channels WHERE run_id = ? ORDER BY channel', (run_id,)).fetchall()
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m gbcr3_daq.run_catalog catalog.sqlite [REGISTER=value ...]")
+    catalog = RunCatalog(sys.argv[1])
+    selection = {name: int(value, 0) for name, value in (item.split('=', 1) for item in sys.argv[2:])}
+    for run in catalog.find_runs(**selection):
+        print(f"{run['run_dir']}  files={run['files']}  aligned_ok={run['aligned_ok']}  aligned_err={run['aligned_err']}  "
+              f"alignment_loss={run['alignment_loss']}")
+    catalog.close()
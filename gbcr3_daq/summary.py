@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+End-of-run summary of a run directory: the run totals appended to
+Filesummary.TXT, and summary.txt built from its ChAll.TXT.
+'''
+import os
+import datetime
+
+from .decode import NUM_CHANNELS
+
+
+# ------------------------------------------------------------------#
+def write_run_totals(store_dict, total_stats, single_ch_stats):
+    """Print the run totals and append them to Filesummary.TXT.
+
+    total_stats is the sum of the summarize_file file_stats of the run, single_ch_stats
+    the sum of the per-channel counters [aligned OK ch0..ch8, aligned error ch0..ch8].
+    """
+    # Use global constants for readability
+    STATS_LABELS = [
+        'File_num', 'Filler_Frames', 'Aligned_OK', 'Aligned_Err', 
+        'NotAligned_Err', 'NotAligned_OK', 'Alignment_Loss', 'Bad_ChannelID', 'All_filler_files'
+    ]
+
+    # Prepare output data
+    files_summary_header = f"{STATS_LABELS[0]:<10} {STATS_LABELS[1]:<14} {STATS_LABELS[2]:<11} {STATS_LABELS[3]:<12} {STATS_LABELS[4]:<15} {STATS_LABELS[5]:<14} {STATS_LABELS[6]:<15} {STATS_LABELS[7]:<14} {STATS_LABELS[8]:<13}"
+    files_summary_data = f"{total_stats[0]:<10} {total_stats[1]:<14} {total_stats[2]:<11} {total_stats[3]:<12} {total_stats[4]:<15} {total_stats[5]:<14} {total_stats[6]:<15} {total_stats[7]:<14} {total_stats[8]:<13}"
+    
+    channel_header = "Channel | Aligned OK | Aligned Error"
+    channel_separator = "--------|------------|-------------"
+    
+    # Display to console
+    print(f"\nFiles Summary:")
+    print(files_summary_header)
+    print(files_summary_data)
+    
+    print(f"\nChannel Statistics Summary:")
+    print(channel_header)
+    print(channel_separator)
+    for i in range(NUM_CHANNELS):
+        print(f"   {i}    |    {single_ch_stats[i]:6d}   |    {single_ch_stats[i+NUM_CHANNELS]:6d}")
+
+    # Write to file (append final summary, header already written during file creation)
+    with open(f"./{store_dict}/Filesummary.TXT", 'a') as infile:
+        infile.write(f"{' '.join(STATS_LABELS)}\n")
+        infile.write(f"{' '.join(map(str, total_stats))}\n")
+        infile.write(f"Channel Statistics Summary:\n")
+        infile.write(f"{channel_header}\n")
+        infile.write(f"{channel_separator}\n")
+        for i in range(NUM_CHANNELS):
+            infile.write(f"   {i}    |    {single_ch_stats[i]:6d}   |    {single_ch_stats[i+NUM_CHANNELS]:6d}\n")
+
+
+def generate_summary(result_dir, dbg_mode=0):
+    dbg = (dbg_mode == 1)
+    
+    dump_file = f"{result_dir}/ChAll.TXT"
+    if os.path.exists(dump_file):
+        with open(dump_file, 'r') as in_file:
+            if dbg == 1: print(f"Opened dump file: {dump_file}") 
+            lines = in_file.readlines()
+    else:
+        print(f"Error in opening result file: {dump_file}")
+        return  
+    
+    max_rx = 7
+    rxout = [4, 5, 6, 7, 0, 1, 2]
+
+    max_daq = 9
+    rxchan = [5, 6, 7, 12, 1, 2, 3, 4, 11]
+    #After swapping
+    #rxchan = [2, 3, 4, 12, 1, 5, 6, 7, 11]
+
+    start_time = [0] * max_daq
+    end_time = [0] * max_daq
+    chan_event = [0] * max_daq
+    start_gen = [0] * max_daq
+    end_gen = [0] * max_daq
+    start_obs = [0] * max_daq
+    end_obs = [0] * max_daq
+    
+    start_year = [0] * max_daq
+    end_year = [0] * max_daq
+    start_month = [0] * max_daq
+    end_month = [0] * max_daq
+    start_day = [0] * max_daq
+    end_day = [0] * max_daq
+    start_hour = [0] * max_daq
+    end_hour = [0] * max_daq
+    start_minute = [0] * max_daq
+    end_minute = [0] * max_daq
+    start_second = [0] * max_daq
+    end_second = [0] * max_daq
+
+    max_frame = 2000
+
+    num_line = 0
+    ind_frame = 0
+    
+
+    for line in lines:
+        num_line += 1
+        if dbg:
+            print(line.strip())
+        if not line.strip():
+            continue
+
+        ch_date_time = line[:26]
+        ch_counters = line[27:].strip()
+        tokens = ch_counters.split()
+
+        try:
+            chan, injgen, injobs, delCRC, timeStamp, expCode, obsCode, ErrMask, CDC32 = ( int(tokens[0]), int(tokens[1]), int(tokens[2]), int(tokens[3]), 
+                int(tokens[4]), int(tokens[5], 16), int(tokens[6], 16), int(tokens[7], 16), int(tokens[8]) )
+        except ValueError as e:
+            print(f"Error parsing line: {line}. Error: {e}")
+            continue
+
+        # Check channel bounds to prevent array access errors
+        if chan < 0 or chan >= max_daq:
+            if dbg:
+                print(f"Invalid channel number {chan}, skipping line")
+            continue
+
+        # Parse timestamp once
+        ch_date_time_trimmed = ch_date_time.split('.')[0]
+        timestamp = datetime.datetime.strptime(ch_date_time_trimmed, "%Y-%m-%d %H:%M:%S")
+        
+        if chan_event[chan] == 0:
+            start_time[chan] = timestamp
+            start_year[chan] = timestamp.year
+            start_month[chan] = timestamp.month
+            start_day[chan] = timestamp.day
+            start_hour[chan] = timestamp.hour
+            start_minute[chan] = timestamp.minute
+            start_second[chan] = timestamp.second
+            start_gen[chan] = injgen
+            start_obs[chan] = injobs
+
+        end_time[chan] = timestamp
+        end_year[chan] = timestamp.year
+        end_month[chan] = timestamp.month
+        end_day[chan] = timestamp.day
+        end_hour[chan] = timestamp.hour
+        end_minute[chan] = timestamp.minute
+        end_second[chan] = timestamp.second
+        end_gen[chan] = injgen
+        end_obs[chan] = injobs
+        chan_event[chan] += 1
+
+    print("End Run Summary\n")
+    print("DAQ Lane  Nevt  Date time   Start/ End       dT(min)   Start Inj/Obs     End Inj/Obs             Ninj/    Nobs\n");
+    with open(f"{result_dir}/summary.txt", 'w') as out_file:
+        out_file.write(f"End of file with {num_line} lines.\n")
+        out_file.write("DAQ Lane  Nevt  Date time   Start/ End       dT(min)   Start Inj/Obs     End Inj/Obs             Ninj/    Nobs\n")
+
+    for j in range(max_daq):
+        ch_chan = f"RX{rxchan[j]}" if rxchan[j] < 10 else f"TX{rxchan[j] - 10}"
+
+        if chan_event[j] == 0:
+            with open(f"{result_dir}/summary.txt", 'a') as out_file:
+                out_file.write(f"Ch{j} {ch_chan:4} {chan_event[j]:5}\n")
+            print(f"Ch{j} {ch_chan:4} {chan_event[j]:5}")
+        else:
+            tstart = f"{start_year[j]:04d}-{start_month[j]:02d}-{start_day[j]:02d} {start_hour[j]:02d}:{start_minute[j]:02d}:{start_second[j]:02d}"
+            tend = f"{end_hour[j]:02d}:{end_minute[j]:02d}:{end_second[j]:02d}"
+
+            del_minute = (end_time[j] - start_time[j]).total_seconds() / 60 if end_time[j] and start_time[j] else 0
+            with open(f"{result_dir}/summary.txt", 'a') as out_file:
+                out_file.write(f"Ch{j} {ch_chan:4} {chan_event[j]:5} {tstart:17} / {tend:9} {del_minute:6.1f} "
+                  f"{start_gen[j]:6} / {start_obs[j]:10}  {end_gen[j]:6} / {end_obs[j]:10}  "
+                  f"{end_gen[j] - start_gen[j]+1:6} / {end_obs[j] - start_obs[j]+1:7}\n")
+            print(f"Ch{j} {ch_chan:4} {chan_event[j]:5} {tstart:17} / {tend:9} {del_minute:6.1f} "
+                  f"{start_gen[j]:6} / {start_obs[j]:10}  {end_gen[j]:6} / {end_obs[j]:10}  "
+                  f"{end_gen[j] - start_gen[j]+1:6} / {end_obs[j] - start_obs[j]+1:7}")
+
+    print(f"Summary written to {result_dir}/summary.txt")
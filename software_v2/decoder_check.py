@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Differential check and benchmark of the gbcr3_daq FIFO decoders.
+
+Every decoder is run over the same FIFO buffers, each in its own scratch run
+directory, and compared with the reference: the frozen original exec_data of
+reference_exec_data.py, run the same way. For every buffer the file_stats and
+per-channel counters returned by the decoder must equal the reference ones,
+Filesummary.TXT must have the same text and ChAll.TXT and every Ch{N}.TXT the same
+error records (the host time column aside). Frames per second are reported per
+decoder, file writes included.
+
+The stream decoders are restarted at every buffer; stream-split feeds each buffer
+in random pieces. CRC sampling and phase resync (fast-sample, fast-resync,
+stream-resync) only differ from the reference after an alignment loss, so they are
+compared on the buffers the reference decodes without one. Finally all buffers are
+fed as one stream in random pieces, with and without phase resync, and must give
+the totals and events of the stream fed in one piece.
+
+The bitwise crc32_8 makes the reference very slow, so it runs with a CRC32_TABLE
+step in its place once that has been checked against crc32_8 on sample frames of
+the buffers; --exact-crc keeps the original crc32_8.
+
+Buffers are synthetic (seeded mixtures of filler, data, error, corrupted and
+shifted frames) and, with --recorded, read from raw captures of big-endian 32-bit
+words cut into 50000-word readouts, or from the Raw.bin / Raw.arc of a main_v2.py --capture run.
+
+    python decoder_check.py
+    python decoder_check.py --buffers 200 --seed 7 --decoders fast pool
+    python decoder_check.py --recorded run1.raw run2.raw
+    python decoder_check.py --buffers 4 --exact-crc
+
+Exits with status 1 if any decoder disagrees with the reference.
+'''
+import os
+import sys
+import time
+import random
+import shutil
+import struct
+import argparse
+import tempfile
+import contextlib
+
+# the shared DAQ core package gbcr3_daq lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from gbcr3_daq import decode
+from gbcr3_daq.crc32_8 import CRC32_TABLE, crc32_8, crc32_update
+from gbcr3_daq.error_records import read_error_file
+from gbcr3_daq.fifo_decoder import FILLER_WORDS, StreamDecoder, cached_crc32_frame, fifo_to_bytes
+from gbcr3_daq.parallel_decode import ParallelDecoder
+from gbcr3_daq.raw_archive import ARCHIVE_MAGIC, open_capture
+from gbcr3_daq.raw_capture import RAW_MAGIC
+
+import reference_exec_data
+
+FIFO_WORDS = 50000
+NUM_CHANNELS = decode.NUM_CHANNELS
+MAX_CHANNEL_ID = decode.MAX_CHANNEL_ID
+
+
+# ------------------------------------------------------------------#
+def table_crc32_8(data, crc32_init):
+    """One byte of crc32_8 as a CRC32_TABLE step."""
+    return (crc32_init << 8 & 0xffff_ffff) ^ CRC32_TABLE[(crc32_init >> 24) ^ data]
+
+
+def sample_payloads(buffers, count=500):
+    """The 28-byte CRC payloads of up to count non-filler frames (at word phase 0) of the buffers."""
+    payloads = []
+    for mem_data in buffers:
+        for i in range(0, FIFO_WORDS - 7, 8):
+            words = mem_data[i:i + 8]
+            if tuple(words) != FILLER_WORDS and min(words) >= 0:
+                payloads.append(struct.pack('>7I', *words[:7]))
+                if len(payloads) >= count:
+                    return payloads
+    return payloads
+
+
+def check_table_crc(payloads):
+    """True if table_crc32_8 chained over every payload (and every byte/state pair) gives the crc32_8 result."""
+    for data in range(256):
+        for state in (0, 0xffff_ffff, 0x1234_5678, 0x8000_0001):
+            if table_crc32_8(data, state) != crc32_8(data, state):
+                return False
+    for payload in payloads:
+        exact = table = 0xffff_ffff
+        for byte in payload:
+            exact = crc32_8(byte, exact)
+            table = table_crc32_8(byte, table)
+        if table != exact:
+            return False
+    return True
+
+
+def run_reference(buffers, exact_crc=False):
+    """Run the frozen original exec_data over the buffers in a scratch directory.
+
+    Returns (results, outputs): the exec_data return values and the run directory
+    outputs (see read_outputs). Unless exact_crc, the bitwise crc32_8 is replaced by
+    table_crc32_8, which must first agree with it on sample payloads of the buffers.
+    """
+    if not exact_crc and not check_table_crc(sample_payloads(buffers)):
+        sys.exit("table_crc32_8 disagrees with crc32_8, rerun with --exact-crc")
+    run_dir = tempfile.mkdtemp(prefix='decoder_check_reference_')
+    crc32 = reference_exec_data.crc32_8
+    if not exact_crc:
+        reference_exec_data.crc32_8 = table_crc32_8
+    try:
+        with _in_dir(run_dir), open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = _run_inline(reference_exec_data.exec_data)(buffers)
+        return results, read_outputs(run_dir)
+    finally:
+        reference_exec_data.crc32_8 = crc32
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+# ------------------------------------------------------------------#
+def _frame(rng, err, chan, good=True):
+    words = [rng.getrandbits(32) for k in range(7)]
+    words[0] = words[0] & 0x07ff_ffff | err << 31 | chan << 27
+    crc = crc32_update(struct.pack('>7I', *words))
+    return words + [crc if good else crc ^ 1 << rng.randrange(32)]
+
+
+def synthetic_buffer(rng, kind):
+    """One 50000-word readout plus the -1 end marker, as Receive_data hands it to exec_data.
+
+    'aligned' readouts hold one unbroken aligned run of filler and valid frames, the
+    case the batched CRCs of the fast decoder are for.
+    """
+    words = []
+    if kind == 'filler':
+        words = [rng.getrandbits(32) for k in range(rng.randrange(8))]
+    while len(words) < FIFO_WORDS:
+        r = rng.random()
+        if kind == 'aligned' and words:
+            words += _frame(rng, rng.random() < 0.05, rng.randrange(9)) if r < 0.7 else FILLER_WORDS
+        elif kind in ('filler', 'aligned') or r < 0.6:
+            words += FILLER_WORDS
+        elif r < 0.8 or kind == 'data':
+            words += _frame(rng, rng.random() < 0.3, rng.choice((0, 1, 2, 3, 4, 5, 6, 7, 8, 8, 9, 10, 15)))
+        elif r < 0.87:
+            words += _frame(rng, rng.random() < 0.5, rng.randrange(9), good=False)
+        elif r < 0.94:
+            words += [rng.getrandbits(32) for k in range(rng.randrange(1, 12))]
+        else:
+            words += FILLER_WORDS[rng.randrange(8):]
+    words = words[:FIFO_WORDS]
+    if rng.random() < 0.1:
+        # short readout, zero padded by Receive_data
+        words = words[:rng.randrange(FIFO_WORDS)]
+    return words + [0] * (FIFO_WORDS - len(words)) + [-1]
+
+
+def synthetic_buffers(count, seed):
+    rng = random.Random(seed)
+    kinds = ('mixed', 'mixed', 'data', 'filler', 'aligned')
+    return [synthetic_buffer(rng, kinds[n % len(kinds)]) for n in range(count)]
+
+
+def recorded_buffers(path):
+    """Cut a raw capture of big-endian 32-bit words into padded 50000-word readouts.
+
+    A main_v2.py --capture file (Raw.bin or Raw.arc) is split along its index instead.
+    """
+    with open(path, 'rb') as in_file:
+        data = in_file.read()
+    if data.startswith((RAW_MAGIC, ARCHIVE_MAGIC)):
+        capture = open_capture(path)
+        for k in range(len(capture)):
+            words = capture.words(k)[:-1]
+            yield words + [0] * (FIFO_WORDS - len(words)) + [-1]
+        capture.close()
+        return
+    words = list(struct.unpack(f'>{len(data) // 4}I', data[:len(data) // 4 * 4]))
+    for start in range(0, len(words), FIFO_WORDS):
+        chunk = words[start:start + FIFO_WORDS]
+        yield chunk + [0] * (FIFO_WORDS - len(chunk)) + [-1]
+
+
+# ------------------------------------------------------------------#
+@contextlib.contextmanager
+def _in_dir(path):
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def _run_inline(decode_file):
+    def run(buffers):
+        return [decode_file(list(mem_data), '.', 0, number) for number, mem_data in enumerate(buffers, 1)]
+    return run
+
+
+def _run_with(**settings):
+    """exec_data_fast with the given frame_decoder attributes set for the run."""
+    def run(buffers):
+        saved = {name: getattr(decode.frame_decoder, name) for name in settings}
+        for name, value in settings.items():
+            setattr(decode.frame_decoder, name, value)
+        try:
+            return _run_inline(decode.exec_data_fast)(buffers)
+        finally:
+            for name, value in saved.items():
+                setattr(decode.frame_decoder, name, value)
+    return run
+
+
+def _run_stream(resync_probe=0):
+    """exec_data_stream, the stream restarted at every buffer."""
+    def run(buffers):
+        decode.stream_decoder.resync_probe = resync_probe
+        try:
+            results = []
+            for number, mem_data in enumerate(buffers, 1):
+                decode.stream_decoder.reset()
+                results.append(decode.exec_data_stream(list(mem_data), '.', 0, number))
+            return results
+        finally:
+            decode.stream_decoder.resync_probe = 0
+    return run
+
+
+def _run_stream_split(buffers):
+    """The stream decoder fed every buffer in random pieces, restarted at every buffer."""
+    rng = random.Random(len(buffers))
+    decoder = StreamDecoder(NUM_CHANNELS - 1, MAX_CHANNEL_ID)
+    results = []
+    for number, mem_data in enumerate(buffers, 1):
+        decoder.reset()
+        buf = fifo_to_bytes(mem_data)
+        errors = []
+        pos = 0
+        while pos < len(buf):
+            size = rng.randrange(1, 64) if rng.random() < 0.7 else rng.randrange(64, FIFO_WORDS)
+            decoder.feed(buf[pos:pos + size * 4])
+            errors.extend(decoder.errors)
+            pos += size * 4
+        results.append(decode.record_file(decoder.totals, errors, '.', 0, number))
+    return results
+
+
+def _run_pool(buffers):
+    pool = ParallelDecoder(2, NUM_CHANNELS - 1, MAX_CHANNEL_ID)
+    try:
+        for number, mem_data in enumerate(buffers, 1):
+            pool.submit(number, fifo_to_bytes(mem_data))
+        return [decode.record_file(ChStat, errors, '.', 0, number) for number, ChStat, errors in pool.collect(wait=True)]
+    finally:
+        pool.close()
+
+
+DECODERS = {
+    'exec_data': _run_inline(decode.exec_data),
+    'fast': _run_inline(decode.exec_data_fast),
+    # per-frame CRC only, the baseline of the batched CRCs of 'fast'
+    'fast-per-frame': _run_with(batch_crc=False),
+    'fast-cache': _run_with(crc32=cached_crc32_frame(4096)),
+    'fast-sample': _run_with(crc_sample=8),
+    'fast-resync': _run_with(resync_probe=4),
+    'pool': _run_pool,
+    'stream': _run_stream(),
+    'stream-split': _run_stream_split,
+    'stream-resync': _run_stream(resync_probe=4),
+}
+# CRC sampling and phase resync change the statistics after an alignment loss by
+# design, so these are checked on the buffers the reference decodes without one
+LOSS_FREE_ONLY = ('fast-sample', 'fast-resync', 'stream-resync')
+
+
+def read_outputs(run_dir):
+    """Filesummary.TXT text and the ChAll.TXT / Ch{N}.TXT records (host time column aside) of a run directory."""
+    outputs = {}
+    for file_name in sorted(os.listdir(run_dir)):
+        path = os.path.join(run_dir, file_name)
+        if file_name == 'Filesummary.TXT':
+            with open(path) as in_file:
+                outputs[file_name] = in_file.read()
+        elif file_name == 'ChAll.TXT' or file_name.startswith('Ch') and file_name[2:-4].isdigit():
+            outputs[file_name] = [tuple(record)[1:] for record in read_error_file(path)]
+    return outputs
+
+
+def check_decoder(name, buffers, expected):
+    """Run one decoder in a scratch directory; returns (seconds, list of mismatch messages)."""
+    expected_results, expected_outputs = expected
+    run_dir = tempfile.mkdtemp(prefix=f'decoder_check_{name}_')
+    try:
+        with _in_dir(run_dir), open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            results = DECODERS[name](buffers)
+            seconds = time.perf_counter() - start
+        problems = []
+        for number, (result, wanted) in enumerate(zip(results, expected_results), 1):
+            if [list(result[0]), list(result[1])] != [list(wanted[0]), list(wanted[1])]:
+                problems.append(f"buffer {number}: stats {result[0]} {result[1]} != {wanted[0]} {wanted[1]}")
+        outputs = read_outputs(run_dir)
+        for file_name in sorted(set(outputs) | set(expected_outputs)):
+            got, wanted = outputs.get(file_name), expected_outputs.get(file_name)
+            if got != wanted:
+                if got is None or wanted is None:
+                    problems.append(f"{file_name}: {'missing' if got is None else 'not written by the reference'}")
+                elif file_name == 'Filesummary.TXT':
+                    problems.append(f"{file_name}: text differs from the reference")
+                else:
+                    problems.append(f"{file_name}: {len(got)} records differ from the {len(wanted)} expected")
+        return seconds, problems
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def stream_feed(stream, sizes, resync_probe):
+    """Totals and events (host time aside) of a StreamDecoder fed stream in pieces of the given word counts."""
+    decoder = StreamDecoder(NUM_CHANNELS - 1, MAX_CHANNEL_ID, resync_probe=resync_probe)
+    events = []
+    pos = 0
+    for size in sizes:
+        events.extend((kind, word, record and tuple(record)[1:])
+                      for kind, word, record in decoder.feed(stream[pos:pos + size * 4]))
+        pos += size * 4
+    return decoder.totals, events
+
+
+def check_stream_splits(buffers, seed, resync_probe, trials=3):
+    """Feed the buffers as one stream split at random; list of the splits that change totals or events."""
+    stream = b''.join(fifo_to_bytes(mem_data) for mem_data in buffers)
+    n_words = len(stream) // 4
+    expected = stream_feed(stream, [n_words], resync_probe)
+    rng = random.Random(seed)
+    problems = []
+    for trial in range(trials):
+        sizes = []
+        while sum(sizes) < n_words:
+            # mostly pieces shorter than the phase lock probe, some of readout size
+            sizes.append(rng.randrange(1, 64) if rng.random() < 0.7 else rng.randrange(64, FIFO_WORDS))
+        totals, events = stream_feed(stream, sizes, resync_probe)
+        if totals != expected[0]:
+            problems.append(f"split {trial + 1} ({len(sizes)} pieces): totals {totals} != {expected[0]}")
+        elif events != expected[1]:
+            problems.append(f"split {trial + 1} ({len(sizes)} pieces): {len(events)} events differ from the {len(expected[1])} expected")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Differential check and benchmark of the FIFO decoders')
+    parser.add_argument('--buffers', type=int, default=40, help='Number of synthetic buffers (default 40)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the synthetic buffers (default 1)')
+    parser.add_argument('--recorded', nargs='*', default=[], help='Raw FIFO captures (big-endian 32-bit words)')
+    parser.add_argument('--decoders', nargs='*', choices=sorted(DECODERS), default=list(DECODERS),
+                        help='Decoders to check (default all)')
+    parser.add_argument('--exact-crc', action='store_true',
+                        help='Run the reference with the original bitwise crc32_8 (slow)')
+    args = parser.parse_args()
+
+    buffers = synthetic_buffers(args.buffers, args.seed)
+    for path in args.recorded:
+        buffers.extend(recorded_buffers(path))
+    frames = len(buffers) * (FIFO_WORDS // 8)
+    print(f"{len(buffers)} buffers, {frames} frames")
+
+    start = time.perf_counter()
+    expected = run_reference(buffers, args.exact_crc)
+    seconds = time.perf_counter() - start
+    print(f"{'reference':16} {seconds:8.2f} s {frames / seconds:12.0f} frames/s")
+
+    failed = False
+    loss_free = None
+    for name in args.decoders:
+        if name in LOSS_FREE_ONLY:
+            if loss_free is None:
+                loss_free = [mem_data for mem_data, result in zip(buffers, expected[0]) if not result[0][6]]
+                loss_free_expected = run_reference(loss_free, args.exact_crc)
+            seconds, problems = check_decoder(name, loss_free, loss_free_expected)
+            checked = f"identical on {len(loss_free)} loss-free buffers"
+            frames_checked = len(loss_free) * (FIFO_WORDS // 8)
+        else:
+            seconds, problems = check_decoder(name, buffers, expected)
+            checked = 'identical'
+            frames_checked = frames
+        print(f"{name:16} {seconds:8.2f} s {frames_checked / max(seconds, 1e-9):12.0f} frames/s  {'MISMATCH' if problems else checked}")
+        for problem in problems[:10]:
+            print(f"    {problem}")
+        failed = failed or bool(problems)
+
+    # the stream decoder must not depend on where the stream is split into buffers
+    for resync_probe in (0, 4):
+        problems = check_stream_splits(buffers, args.seed, resync_probe)
+        name = f"stream splits{' resync' if resync_probe else ''}"
+        print(f"{name:16} {'MISMATCH' if problems else 'identical to one piece'}")
+        for problem in problems:
+            print(f"    {problem}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
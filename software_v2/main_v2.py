@@ -2,45 +2,32 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
-import copy
 import time
 import datetime
-import struct
 import socket
-import threading
 import argparse
-from queue import Queue
-from queue import Empty
+
+# the shared DAQ core package gbcr3_daq lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
 from GBCR3_Config import GBCR3_Config, parse_channel_config
 from command_interpret import *
-from crc32_8 import crc32_8
+from gbcr3_daq.backpressure import BackpressureMonitor
+from gbcr3_daq.decode import (NUM_CHANNELS, CHANNEL_STATS_SIZE, MAX_CHANNEL_ID, exec_data, exec_data_fast, exec_data_stream,
+                              record_file, start_file_summary, frame_decoder, stream_decoder, error_limiter, write_error_rate, flight_recorder,
+                              error_writers, error_log, channel_index, file_stats_stream)
+from gbcr3_daq.fifo_decoder import cached_crc32_frame, crc_cache_report, crc_sample_report, fifo_to_bytes, resync_report
+from gbcr3_daq.iic import attach, iic_read, iic_write, Current_monitor
+from gbcr3_daq.parallel_decode import ParallelDecoder
+from gbcr3_daq.raw_archive import RawArchive
+from gbcr3_daq.raw_capture import RawCapture
+from gbcr3_daq.run_catalog import RunCatalog
+from gbcr3_daq.summary import generate_summary, write_run_totals
+from gbcr3_daq.writer_pool import FLUSH_INTERVAL
 
-# Constants
-NUM_CHANNELS = 9
-CHANNEL_STATS_SIZE = NUM_CHANNELS * 2  # Aligned OK + Aligned Error
-MAX_CHANNEL_ID = 10
 hostname = '192.168.2.6'  # Fixed FPGA IP address at SLAC
 port = 1024  # port number
 
-# ---------------------------
-# Helper functions
-# ------------------------------------------------------------------#
-def write_error_data(store_dict, channel_id, time_obj, channel_id_val, inject_error, error_counter, 
-                     crc_diff, time_stamp, expected_code, received_code, error_position, crc32):
-    """Write error data to both ChAll.TXT and individual channel files."""
-    error_line = f'{time_obj} {channel_id_val} {inject_error} {error_counter} {crc_diff} {time_stamp} {expected_code:08x} {received_code:08x} {error_position:08x} {crc32}\n'
-    
-    # Write to main error file
-    with open(f"./{store_dict}/ChAll.TXT", 'a') as infile:
-        infile.write(error_line)
-        infile.flush()
-    
-    # Write to individual channel file
-    with open(f"./{store_dict}/Ch{channel_id}.TXT", 'a') as infile:
-        infile.write(error_line)
-        infile.flush()
-
 # ------------------------------------------------------------------#
 def main():
     parser = argparse.ArgumentParser(description='GBCR3 Data Acquisition with configurable parameters')
@@ -64,8 +51,61 @@ def main():
                        help='Quick preset: Disable specific RX channel (format: rx4)')
     parser.add_argument('--delay', type=str,
                        help='Default clock delay (hex format like 0x8, used with retimed preset)')
+
+    # Decoder selection
+    parser.add_argument('--decoder', choices=['fast', 'original', 'stream'], default='fast',
+                       help='FIFO decoder: fast - struct based FrameDecoder (default); original - exec_data frame loop; '
+                            'stream - alignment and partial frames carried across files')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Decode FIFO buffers in this many worker processes (fast decoder only, default 1 = in line)')
+    parser.add_argument('--crc-cache', type=int, default=0,
+                       help='Memoize frame CRCs in an LRU cache of this many payloads (fast/stream decoders, default 0 = off)')
+    parser.add_argument('--crc-sample', type=int, default=1,
+                       help='Verify the CRC of 1 in N aligned OK frames plus every frame after an anomaly '
+                            '(in-line fast/stream decoders, default 1 = all)')
+    parser.add_argument('--error-rate', type=int, default=0,
+                       help='Write at most N error records per second per channel, the rest summarized in ErrorRate.TXT; '
+                            'statistics stay exact (default 0 = all)')
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL,
+                       help='Keep ChAll.TXT / Ch{N}.TXT open with a 1 MiB buffer, flushed every this many seconds at a file '
+                            f'boundary (default {FLUSH_INTERVAL:g}; 0 = at every file boundary; negative = open and close per write)')
+    parser.add_argument('--capture', nargs='?', const='raw', choices=['raw', 'zlib', 'lzma'],
+                       help='Keep every raw FIFO buffer for re-decoding the run: raw - Raw.bin with its index Raw.idx '
+                            '(default); zlib/lzma - compressed chunks in Raw.arc with the index Raw.aix')
+    parser.add_argument('--channel-index', action='store_true',
+                       help='Write the error lines to ChAll.TXT only, with the channel offset index ChAll.cix; '
+                            'python -m gbcr3_daq.channel_index generates Ch{N}.TXT on demand')
+    parser.add_argument('--catalog', nargs='?', const='',
+                       help='Record the register map, arguments and statistics of the run in an SQLite run catalog: '
+                            'catalog.sqlite next to the run folders, or PATH (default off)')
+    parser.add_argument('--binary-log', action='store_true',
+                       help='Also write the error records to ErrorLog.bin, fixed-width rows for numpy.memmap')
+    parser.add_argument('--phase-resync', type=int, default=0,
+                       help='After an alignment loss lock on the frame phase with the most filler / valid-CRC frames among '
+                            'the next N, word scan only if none (fast/stream decoders, default 0 = word scan as exec_data)')
+    parser.add_argument('--flight-recorder', type=int, default=0,
+                       help='Keep the last N raw FIFO buffers and dump them to FlightRecorder/ on an alignment loss, '
+                            'bad channel ID or CRC mismatch (default 0 = off)')
+    parser.add_argument('--backpressure', type=float, default=0,
+                       help='Switch to counting-only decoding while the backlog (worker queue depth, or the moving average '
+                            'of decode time over FIFO read time; 1.0 = just keeping up) is above this, back below half of it '
+                            '(default 0 = off)')
     
     args = parser.parse_args()
+    if args.workers > 1 and args.decoder != 'fast':
+        parser.error('--workers needs the fast decoder')
+    if args.crc_sample < 1:
+        parser.error('--crc-sample must be at least 1')
+    if args.crc_sample > 1 and (args.workers > 1 or args.decoder == 'original'):
+        parser.error('--crc-sample needs the in-line fast or stream decoder')
+    if args.error_rate < 0:
+        parser.error('--error-rate must not be negative')
+    if args.phase_resync < 0 or (args.phase_resync > 0 and args.decoder == 'original'):
+        parser.error('--phase-resync needs a positive frame count and the fast or stream decoder')
+    if args.flight_recorder < 0:
+        parser.error('--flight-recorder must not be negative')
+    if args.backpressure < 0 or (args.backpressure > 0 and args.decoder == 'original'):
+        parser.error('--backpressure needs a positive threshold and the fast or stream decoder')
     
     # Handle quick presets
     if not args.rx_config:
@@ -115,141 +155,28 @@ def main():
     num_file = args.num_files
     dbg_mode = args.debug_mode
     store_dict = userdefine_dir
-
-    Receive_data(store_dict, num_file, dbg_mode, args.rx_config, args.tx_config, args.clock_config)
+    catalog = args.catalog
+    if catalog == '':
+        # next to the run folders, in the parent of store_dict
+        catalog = os.path.join(os.path.dirname(store_dict), 'catalog.sqlite')
+
+    Receive_data(store_dict, num_file, dbg_mode, args.rx_config, args.tx_config, args.clock_config,
+                 decoder=args.decoder, workers=args.workers, crc_cache=args.crc_cache, crc_sample=args.crc_sample,
+                 error_rate=args.error_rate, backpressure=args.backpressure, flight_recorder_depth=args.flight_recorder,
+                 phase_resync=args.phase_resync, flush_interval=args.flush_interval, binary_log=args.binary_log,
+                 capture=args.capture, channel_files_index=args.channel_index,
+                 catalog=catalog, run_args=vars(args))
     print(" line 52, All jobs are done!")
 
 def print_bytes_hex(data):
     lin = ['0x%02X' % i for i in data]
     print(" ".join(lin))
 
-def generate_summary(result_dir, dbg_mode=0):
-    dbg = (dbg_mode == 1)
-    
-    dump_file = f"{result_dir}/ChAll.TXT"
-    if os.path.exists(dump_file):
-        with open(dump_file, 'r') as in_file:
-            if dbg == 1: print(f"Opened dump file: {dump_file}") 
-            lines = in_file.readlines()
-    else:
-        print(f"Error in opening result file: {dump_file}")
-        return  
-    
-    max_rx = 7
-    rxout = [4, 5, 6, 7, 0, 1, 2]
-
-    max_daq = 9
-    rxchan = [5, 6, 7, 12, 1, 2, 3, 4, 11]
-    #After swapping
-    #rxchan = [2, 3, 4, 12, 1, 5, 6, 7, 11]
-
-    start_time = [0] * max_daq
-    end_time = [0] * max_daq
-    chan_event = [0] * max_daq
-    start_gen = [0] * max_daq
-    end_gen = [0] * max_daq
-    start_obs = [0] * max_daq
-    end_obs = [0] * max_daq
-    
-    start_year = [0] * max_daq
-    end_year = [0] * max_daq
-    start_month = [0] * max_daq
-    end_month = [0] * max_daq
-    start_day = [0] * max_daq
-    end_day = [0] * max_daq
-    start_hour = [0] * max_daq
-    end_hour = [0] * max_daq
-    start_minute = [0] * max_daq
-    end_minute = [0] * max_daq
-    start_second = [0] * max_daq
-    end_second = [0] * max_daq
-
-    max_frame = 2000
-
-    num_line = 0
-    ind_frame = 0
-    
-
-    for line in lines:
-        num_line += 1
-        if dbg:
-            print(line.strip())
-        if not line.strip():
-            continue
-
-        ch_date_time = line[:26]
-        ch_counters = line[27:].strip()
-        tokens = ch_counters.split()
-
-        try:
-            chan, injgen, injobs, delCRC, timeStamp, expCode, obsCode, ErrMask, CDC32 = ( int(tokens[0]), int(tokens[1]), int(tokens[2]), int(tokens[3]), 
-                int(tokens[4]), int(tokens[5], 16), int(tokens[6], 16), int(tokens[7], 16), int(tokens[8]) )
-        except ValueError as e:
-            print(f"Error parsing line: {line}. Error: {e}")
-            continue
-
-        # Check channel bounds to prevent array access errors
-        if chan < 0 or chan >= max_daq:
-            if dbg:
-                print(f"Invalid channel number {chan}, skipping line")
-            continue
-
-        # Parse timestamp once
-        ch_date_time_trimmed = ch_date_time.split('.')[0]
-        timestamp = datetime.datetime.strptime(ch_date_time_trimmed, "%Y-%m-%d %H:%M:%S")
-        
-        if chan_event[chan] == 0:
-            start_time[chan] = timestamp
-            start_year[chan] = timestamp.year
-            start_month[chan] = timestamp.month
-            start_day[chan] = timestamp.day
-            start_hour[chan] = timestamp.hour
-            start_minute[chan] = timestamp.minute
-            start_second[chan] = timestamp.second
-            start_gen[chan] = injgen
-            start_obs[chan] = injobs
-
-        end_time[chan] = timestamp
-        end_year[chan] = timestamp.year
-        end_month[chan] = timestamp.month
-        end_day[chan] = timestamp.day
-        end_hour[chan] = timestamp.hour
-        end_minute[chan] = timestamp.minute
-        end_second[chan] = timestamp.second
-        end_gen[chan] = injgen
-        end_obs[chan] = injobs
-        chan_event[chan] += 1
-
-    print("End Run Summary\n")
-    print("DAQ Lane  Nevt  Date time   Start/ End       dT(min)   Start Inj/Obs     End Inj/Obs             Ninj/    Nobs\n");
-    with open(f"{result_dir}/summary.txt", 'w') as out_file:
-        out_file.write(f"End of file with {num_line} lines.\n")
-        out_file.write("DAQ Lane  Nevt  Date time   Start/ End       dT(min)   Start Inj/Obs     End Inj/Obs             Ninj/    Nobs\n")
 
-    for j in range(max_daq):
-        ch_chan = f"RX{rxchan[j]}" if rxchan[j] < 10 else f"TX{rxchan[j] - 10}"
-
-        if chan_event[j] == 0:
-            with open(f"{result_dir}/summary.txt", 'a') as out_file:
-                out_file.write(f"Ch{j} {ch_chan:4} {chan_event[j]:5}\n")
-            print(f"Ch{j} {ch_chan:4} {chan_event[j]:5}")
-        else:
-            tstart = f"{start_year[j]:04d}-{start_month[j]:02d}-{start_day[j]:02d} {start_hour[j]:02d}:{start_minute[j]:02d}:{start_second[j]:02d}"
-            tend = f"{end_hour[j]:02d}:{end_minute[j]:02d}:{end_second[j]:02d}"
-
-            del_minute = (end_time[j] - start_time[j]).total_seconds() / 60 if end_time[j] and start_time[j] else 0
-            with open(f"{result_dir}/summary.txt", 'a') as out_file:
-                out_file.write(f"Ch{j} {ch_chan:4} {chan_event[j]:5} {tstart:17} / {tend:9} {del_minute:6.1f} "
-                  f"{start_gen[j]:6} / {start_obs[j]:10}  {end_gen[j]:6} / {end_obs[j]:10}  "
-                  f"{end_gen[j] - start_gen[j]+1:6} / {end_obs[j] - start_obs[j]+1:7}\n")
-            print(f"Ch{j} {ch_chan:4} {chan_event[j]:5} {tstart:17} / {tend:9} {del_minute:6.1f} "
-                  f"{start_gen[j]:6} / {start_obs[j]:10}  {end_gen[j]:6} / {end_obs[j]:10}  "
-                  f"{end_gen[j] - start_gen[j]+1:6} / {end_obs[j] - start_obs[j]+1:7}")
-
-    print(f"Summary written to {result_dir}/summary.txt")
-
-
-def Receive_data(store_dict, num_file, dbg_mode=0, rx_configs=None, tx_configs=None, clock_config=None):
+def Receive_data(store_dict, num_file, dbg_mode=0, rx_configs=None, tx_configs=None, clock_config=None, *,
+                 decoder='fast', workers=1, crc_cache=0, crc_sample=1, error_rate=0, backpressure=0, flight_recorder_depth=0,
+                 phase_resync=0, flush_interval=FLUSH_INTERVAL, binary_log=False,
+                 capture=None, channel_files_index=False, catalog=None, run_args=None):
     # begin iic initilization -----------------------------------------------------------------------------------#
     # write, read back, and compare
 
@@ -308,15 +235,62 @@ def Receive_data(store_dict, num_file, dbg_mode=0, rx_configs=None, tx_configs=N
         print("Written != Read: %s"%(iic_read_val))
     #end iic initilization -----------------------------------------------------------------------------------#
 
-    if os.path.exists(f"./{store_dict}/Filesummary.TXT") == False:
-        with open(f"./{store_dict}/Filesummary.TXT", 'w') as infile:
-            infile.write('# File_num  Filler_Frames  Aligned_OK  Aligned_Err  NotAligned_Err  NotAligned_OK  Alignment_Loss  Bad_ChannelID  Total_Frames\n')
+    start_file_summary(store_dict)
+    file_stats_stream.open(f"./{store_dict}/FileStats.csv")
 
     total_stats = [0, 0, 0, 0, 0, 0, 0, 0, 0]
     current_file_number = 0
 
     single_ch_stats = [0] * CHANNEL_STATS_SIZE
 
+    # registered once the registers are written
+    run_catalog = RunCatalog(catalog) if catalog else None
+    if run_catalog is not None:
+        run_catalog.start_run(store_dict, GBCR3_Config1._regMap, run_args)
+
+    def add_file_stats(number, file_stats, current_channel_stats):
+        if run_catalog is not None:
+            run_catalog.add_file(number, file_stats, current_channel_stats)
+        for i in range(len(total_stats)):
+            total_stats[i] += file_stats[i]
+        for i in range(len(current_channel_stats)):
+            single_ch_stats[i] += current_channel_stats[i]
+
+    decode_file = {'fast': exec_data_fast, 'stream': exec_data_stream}.get(decoder, exec_data)
+    pool = ParallelDecoder(workers, NUM_CHANNELS - 1, MAX_CHANNEL_ID, crc_cache=crc_cache,
+                           resync_probe=phase_resync) if workers > 1 else None
+    if crc_cache > 0:
+        # memoize the frame CRCs of the in-line decoders
+        frame_decoder.crc32 = stream_decoder.crc32 = cached_crc32_frame(crc_cache)
+    frame_decoder.crc_sample = stream_decoder.crc_sample = crc_sample
+    frame_decoder.resync_probe = stream_decoder.resync_probe = phase_resync
+    error_limiter.max_rate = error_rate
+    error_writers.keep_open = flush_interval >= 0
+    error_writers.flush_interval = flush_interval
+    if binary_log:
+        error_log.open(f"./{store_dict}/ErrorLog.bin")
+    if channel_files_index:
+        channel_index.open(store_dict)
+    if capture in ('zlib', 'lzma'):
+        # compressed on a background thread
+        raw_capture = RawArchive(f"./{store_dict}", capture)
+    else:
+        raw_capture = RawCapture(f"./{store_dict}") if capture else None
+    # a failing capture stops capturing, not the run; raised once the run outputs are written
+    capture_error = None
+    # with workers a buffer is checked up to max_pending buffers after it was recorded
+    flight_recorder.depth = flight_recorder_depth + (pool.max_pending if pool is not None and flight_recorder_depth else 0)
+    # counting-only decoding while the decode stage falls behind the FIFO
+    # (inline, the decode/read time ratio is averaged over about 5 buffers)
+    monitor = BackpressureMonitor(backpressure, log_path=f"./{store_dict}/Backpressure.TXT",
+                                  smoothing=1.0 if pool is not None else 0.2) if backpressure > 0 else None
+    counting_files = set()
+    decode_seconds = 0.0
+
+    def count_file(number, file_stats):
+        if monitor is not None:
+            monitor.count(file_stats, number in counting_files)
+            counting_files.discard(number)
 
     for files in range(num_file):
 
@@ -349,376 +323,103 @@ def Receive_data(store_dict, num_file, dbg_mode=0, rx_configs=None, tx_configs=N
             # end with
         # end if files % 10 == 0
 
+        read_start = time.perf_counter()
         mem_data = cmd_interpret.read_data_fifo(50000)
-        # ensure mem_data have 50001 byte
-        for i in range(50000 - len(mem_data)):
-            mem_data.append(0)
+        read_seconds = time.perf_counter() - read_start
+        if raw_capture is not None:
+            # the words as read, before padding
+            try:
+                raw_capture.append(current_file_number, mem_data)
+            except (RuntimeError, OSError) as error:
+                capture_error = error
+                print(f"Raw capture stopped at file {current_file_number}: {error}")
+                try:
+                    raw_capture.close()
+                except (RuntimeError, OSError):
+                    pass
+                raw_capture = None
+        # ensure mem_data have 50001 byte; the stream decoder only takes the words actually read
+        if decoder != 'stream':
+            for i in range(50000 - len(mem_data)):
+                mem_data.append(0)
         mem_data.append(-1)
         if files % 10 == 0:
             if dbg_mode == 1: print(f"Receive_data is producing {files} to the queue!")
         # end if files % 10 == 0 
+        counting = False
+        if monitor is not None:
+            backlog = pool.pending() / pool.max_pending if pool is not None else decode_seconds / max(read_seconds, 1e-6)
+            counting = monitor.update(current_file_number, backlog)
+            frame_decoder.counting = stream_decoder.counting = counting
+            if counting:
+                counting_files.add(current_file_number)
+        decode_start = time.perf_counter()
         # exec_data(mem_data, store_dict, dbg_mode)
-        file_stats, current_channel_stats = exec_data(mem_data, store_dict, dbg_mode, current_file_number)
-
-        for i in range(len(total_stats)):
-            total_stats[i] += file_stats[i]
+        if pool is not None:
+            # decoded in worker processes, results are written back in file order
+            buf = fifo_to_bytes(mem_data)
+            flight_recorder.record(current_file_number, buf)
+            pool.submit(current_file_number, buf, counting)
+            decoded = [(number, record_file(ChStat, errors, store_dict, dbg_mode, number)) for number, ChStat, errors in pool.collect()]
+        else:
+            decoded = [(current_file_number, decode_file(mem_data, store_dict, dbg_mode, current_file_number))]
 
-        for i in range(len(current_channel_stats)):
-            single_ch_stats[i] += current_channel_stats[i]
+        for number, (file_stats, current_channel_stats) in decoded:
+            add_file_stats(number, file_stats, current_channel_stats)
+            count_file(number, file_stats)
+        decode_seconds = time.perf_counter() - decode_start
             
         if files % 20 == 0: print(f"{files} files have been processed!")
         # End of file processing loop
     # end for files in range(num_file)
+    if pool is not None:
+        for number, ChStat, errors in pool.collect(wait=True):
+            file_stats, current_channel_stats = record_file(ChStat, errors, store_dict, dbg_mode, number)
+            add_file_stats(number, file_stats, current_channel_stats)
+            count_file(number, file_stats)
+        pool.close()
+    flight_recorder.close()
     print("'Receive_data' finished!")
+    if crc_cache > 0 and pool is None and decoder != 'original':
+        print(crc_cache_report(frame_decoder.crc32))
+    if crc_sample > 1:
+        print(crc_sample_report(stream_decoder if decoder == 'stream' else frame_decoder))
+    if phase_resync > 0 and pool is None:
+        print(resync_report(stream_decoder if decoder == 'stream' else frame_decoder))
+    if monitor is not None:
+        frame_decoder.counting = stream_decoder.counting = False
+        print(monitor.report())
+    if flight_recorder.dumps:
+        print(f"Flight recorder: {flight_recorder.dumps} anomalies dumped to {store_dict}/FlightRecorder")
+    if error_rate > 0:
+        write_error_rate(store_dict, flush=True)
+        print(error_limiter.report())
+    error_writers.close()
+    error_log.close()
+    channel_index.close()
+    file_stats_stream.close()
+    if raw_capture is not None:
+        try:
+            raw_capture.close()
+        except (RuntimeError, OSError) as error:
+            capture_error = error
+            print(f"Raw capture failed: {error}")
+        else:
+            if capture in ('zlib', 'lzma'):
+                print(raw_capture.report())
+            else:
+                print(f"Raw capture: {raw_capture.buffers} buffers in {raw_capture.raw_path}")
 
-    # Use global constants for readability
-    STATS_LABELS = [
-        'File_num', 'Filler_Frames', 'Aligned_OK', 'Aligned_Err', 
-        'NotAligned_Err', 'NotAligned_OK', 'Alignment_Loss', 'Bad_ChannelID', 'All_filler_files'
-    ]
-
-    # Prepare output data
-    files_summary_header = f"{STATS_LABELS[0]:<10} {STATS_LABELS[1]:<14} {STATS_LABELS[2]:<11} {STATS_LABELS[3]:<12} {STATS_LABELS[4]:<15} {STATS_LABELS[5]:<14} {STATS_LABELS[6]:<15} {STATS_LABELS[7]:<14} {STATS_LABELS[8]:<13}"
-    files_summary_data = f"{total_stats[0]:<10} {total_stats[1]:<14} {total_stats[2]:<11} {total_stats[3]:<12} {total_stats[4]:<15} {total_stats[5]:<14} {total_stats[6]:<15} {total_stats[7]:<14} {total_stats[8]:<13}"
-    
-    channel_header = "Channel | Aligned OK | Aligned Error"
-    channel_separator = "--------|------------|-------------"
-    
-    # Display to console
-    print(f"\nFiles Summary:")
-    print(files_summary_header)
-    print(files_summary_data)
-    
-    print(f"\nChannel Statistics Summary:")
-    print(channel_header)
-    print(channel_separator)
-    for i in range(NUM_CHANNELS):
-        print(f"   {i}    |    {single_ch_stats[i]:6d}   |    {single_ch_stats[i+NUM_CHANNELS]:6d}")
-
-    # Write to file (append final summary, header already written during file creation)
-    with open(f"./{store_dict}/Filesummary.TXT", 'a') as infile:
-        infile.write(f"{' '.join(STATS_LABELS)}\n")
-        infile.write(f"{' '.join(map(str, total_stats))}\n")
-        infile.write(f"Channel Statistics Summary:\n")
-        infile.write(f"{channel_header}\n")
-        infile.write(f"{channel_separator}\n")
-        for i in range(NUM_CHANNELS):
-            infile.write(f"   {i}    |    {single_ch_stats[i]:6d}   |    {single_ch_stats[i+NUM_CHANNELS]:6d}\n")
-    
+    write_run_totals(store_dict, total_stats, single_ch_stats)
+    if run_catalog is not None:
+        run_catalog.finish_run(total_stats, single_ch_stats)
+        run_catalog.close()
     generate_summary(store_dict, dbg_mode)
+    if capture_error is not None:
+        raise capture_error
 # end def Receive_data
 # ---------------------------------------------------------------------------------------------#
 
-# ---------------------------------------------------------------------
-# ------------------------#
-def exec_data(mem_data, store_dict, dbg_mode=0, current_file_number=0):
-    isEnd = False
-    count = 0
-    aligned = 0
-    i = 0
-
-    dbg = (dbg_mode == 1)
-    #
-    # Collect frame stat=2*Aligned+Err by channel  
-    # Ch=9 is filler without channel ID 
-    #
-    ChStat = [
-        [0,0,0,0,0,0,0,0,0,0,0],
-        [0,0,0,0,0,0,0,0,0,0,0],
-        [0,0,0,0,0,0,0,0,0,0,0],
-        [0,0,0,0,0,0,0,0,0,0,0]
-    ]
-    # for i in range(6250)
-    while i < 50001:
-        # get 8 words to combine a frame
-        val = [0, 0, 0, 0, 0, 0, 0, 0]
-        for k in range(8):
-            if i > 50000:
-                isEnd = True
-            else:
-                val[k] = mem_data[i]
-                i = i + 1
-            #end if
-        if val[-1] < 0:
-            # print("line 204", val)
-            isEnd = True
-        if isEnd:
-            break
-        Rawdata = val[0] << (96 + 128) | val[1] << (64 + 128) | val[2] << (32 + 128) | val[3] << 128 | val[4] << 96 | val[5] << 64 | val[6] << 32 | val[7]
-        # end get 8 words
-        # if i<200: 
-        #  print("i=%5i aligned=%i Rawdata=%x" % (i,aligned,Rawdata) )
-        # #end if
-        # tentative evaluation Error flag and channel ID  
-        StatErr  = val[0]>>31&1 
-        StatChan = val[0]>>27&0xF  
-
-        aligned_error_counter = 0
-        if aligned == 1:
-            error_flag = (
-                                 Rawdata & 0x8000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (127 + 128)  # error flag
-
-            # if aligned, display on the screen and save to files
-            if error_flag == 1:
-                aligned_error_counter += 1
-                channel_id = (
-                                     Rawdata & 0x7800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
-                                     123 + 128)  # channel Id
-                time_stamp = (
-                                     Rawdata & 0x07ff_ffff_ffff_f800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
-                                     79 + 128 - 4)  # time stamp
-                inject_error = (
-                                       Rawdata & 0x0000_0000_0000_07ff_f800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
-                                       59 + 128)  # inject error
-                expected_code = (
-                                        Rawdata & 0x0000_0000_0000_0000_07ff_ffff_f800_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
-                                        27 + 128)
-                received_code = (
-                                        Rawdata & 0x0000_0000_0000_0000_0000_0000_07ff_ffff_f800_0000_0000_0000_0000_0000_0000_0000) >> 123  # received data
-                error_position = (
-                                         Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_07ff_ffff_f800_0000_0000_0000_0000_0000) >> 91
-                error_counter = (
-                                        Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_07ff_ffff_ffff_ffff_0000_0000) >> 32
-                crc32 = (
-                                Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_ffff_ffff) >> 0
-                cal_crc_data = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-                for k in range(28):
-                    shift = 0xff00_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000 >> (k * 8)
-                    cal_crc_data[k] = (Rawdata & shift) >> (248 - k * 8)
-                # end for
-                cal_crc32 = crc32_8(cal_crc_data[0], 0xffff_ffff)
-                for k in range(27):
-                    cal_crc32_t = crc32_8(cal_crc_data[k + 1], cal_crc32)
-                    cal_crc32 = cal_crc32_t
-
-                Time = datetime.datetime.now()
-                if dbg == 1 and aligned_error_counter < 20: 
-                    print(f'{Time} {channel_id} {inject_error} {error_counter} {cal_crc32 - crc32} {time_stamp} {expected_code:08x} {received_code:08x} {error_position:08x} {crc32}')
-                
-                # Write error data to both files using helper function
-                write_error_data(store_dict, channel_id, Time, channel_id, inject_error, error_counter, 
-                               cal_crc32 - crc32, time_stamp, expected_code, received_code, error_position, crc32)
-                # Frame stat Aligned with Error
-                if channel_id < MAX_CHANNEL_ID:
-                    ChStat[3][channel_id] = ChStat[3][channel_id] + 1
-                else:
-                    if dbg == 1: print(f"Bad channel_id {channel_id}")
-                    ChStat[3][10] = ChStat[3][10] + 1
-                #end if
-            else:  # error_flag != 1
-                if Rawdata == 0x3c5c_7c5c_0000_0000_0000_0000_1234_4321_7d6d_7a5a_0000_0000_0000_0000_5566_6655:
-                    ChStat[2][9] = ChStat[2][9] + 1 
-                else:
-                    channel_id = (
-                                     Rawdata & 0x7800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
-                                     123 + 128)  # channel Id
-                    crc32 = (
-                                Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_ffff_ffff) >> 0
-                    cal_crc_data = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-                    for k in range(28):
-                        shift = 0xff00_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000 >> (k * 8)
-                        cal_crc_data[k] = (Rawdata & shift) >> (248 - k * 8)
-                    cal_crc32 = crc32_8(cal_crc_data[0], 0xffff_ffff)
-                    for k in range(27):
-                        cal_crc32_t = crc32_8(cal_crc_data[k + 1], cal_crc32)
-                        cal_crc32 = cal_crc32_t
-                        
-                    if cal_crc32 - crc32 == 0 and channel_id < MAX_CHANNEL_ID:
-                        ChStat[2][channel_id] = ChStat[2][channel_id] + 1
-                    else:
-                        aligned = 0
-                        if dbg == 1: print(f"Line 407, ALignment loss Rawdata is {Rawdata:x}")
-                        ChStat[2][10] = ChStat[2][10] + 1
-            # end if error_flag
-        else:  # aligned != 1
-            if i<200 and dbg == 1:
-                print(f"Not aligned chan={StatChan}  Rawdata={Rawdata:x}")
-            while aligned == 0:
-                if i > 50000:
-                    isEnd = True
-                else:
-                    value = mem_data[i]
-                    i = i + 1
-                    if value < 0:
-                        isEnd = True
-                    else:
-                        for k in range(7):
-                            val[k] = val[k + 1]
-                        val[7] = value
-                        Rawdata = val[0] << (96 + 128) | val[1] << (64 + 128) | val[2] << (32 + 128) | val[3] << 128 | val[4] << 96 | val[5] << 64 | val[6] << 32 | val[7]
-                    # end if
-                    if Rawdata == 0x3c5c_7c5c_0000_0000_0000_0000_1234_4321_7d6d_7a5a_0000_0000_0000_0000_5566_6655:
-                        #print("aligned here")
-                        aligned = 1
-                        # Filler frame without channel - use chan=9
-                        ChStat[2][9] = ChStat[2][9] + 1;
-                    else:
-                        #print("not aligned here")
-                        aligned = 0
-                        # make best attempt to dead reckoning alignment for no-alignment frames 
-                        remainder = i % 8
-                        if isEnd==0 and remainder==1:  
-                            ErrNA  = val[0]>>31&1 
-                            ChanNA = val[0]>>27&0xF
-                            if ChanNA > (NUM_CHANNELS - 1):
-                                if dbg == 1: print(f"Not aligned i={i} bad chan={ChanNA}  Rawdata={Rawdata:x}")
-                                ChanNA = NUM_CHANNELS - 1
-                            else:
-                                if dbg == 1: print(f"Not aligned i={i} chan={ChanNA}  Rawdata={Rawdata:x}")
-                            #end if
-                            ChStat[ErrNA][ChanNA] = ChStat[ErrNA][ChanNA] + 1 
-                        #end if remainer = 1 
-                    # end if
-                if isEnd:
-                    break
-            # end while aligned
-        # end if aligned
-    # end for 6250. One buffer is done.
-
-    #print("loops ended")
-    ChanCnt_NA_OK = 0
-    ChanCnt_NA_Err = 0
-    ChanCnt_AL_Err = 0
-    ChanCnt_AL_OK = 0
-    Total_frames = 0
-    
-    for n in range(3):
-        if n == 0:
-            for m in range(11):
-                ChanCnt_NA_OK = ChanCnt_NA_OK + ChStat[n][m]
-        if n == 1:
-            for m in range(11):
-                ChanCnt_NA_Err = ChanCnt_NA_Err + ChStat[n][m]
-        if n > 1:
-            for m in range(NUM_CHANNELS):
-                if dbg == 1:
-                    print(f" file summary Chan {m}: Data frame Aligned Err/OK={ChStat[3][m]}/{ChStat[2][m]}")
-                ChanCnt_AL_Err += ChStat[3][m]
-                ChanCnt_AL_OK  += ChStat[2][m]
-
-    if dbg == 1:
-        print(f" file summary filler frames= {ChStat[2][9]}")
-        print(f" file summary aligned data OK= {ChanCnt_AL_OK}")
-        print(f" file summary aligned data Err= {ChanCnt_AL_Err}")
-        print(f" file summary: Not aligned Err/OK={ChanCnt_NA_Err}/{ChanCnt_NA_OK}")
-        print(f" file summary ALignment loss: {ChStat[2][10]}")
-        print(f" file summary Aligned with Error, bad channel id: {ChStat[3][10]}")
-        print(" Next File...")
-        
-    Total_frames = ChStat[2][9] + ChanCnt_AL_OK + ChanCnt_AL_Err + ChanCnt_NA_Err + ChanCnt_NA_OK + ChStat[2][10] + ChStat[3][10]
-
-    data_exist_counter = ChanCnt_AL_OK + ChanCnt_AL_Err
-
-    file_stats = [1,ChStat[2][9], ChanCnt_AL_OK, ChanCnt_AL_Err, ChanCnt_NA_Err, ChanCnt_NA_OK, ChStat[2][10], 
-                 ChStat[3][10], 1 if data_exist_counter == 0 else 0]
-
-    # Collect channel statistics: [aligned_OK_ch0..ch8, aligned_Error_ch0..ch8]
-    current_channel_stats = [ChStat[2][i] for i in range(NUM_CHANNELS)]  # Aligned OK
-    current_channel_stats.extend([ChStat[3][i] for i in range(NUM_CHANNELS)])  # Aligned Error
-
-
-    with open(f"./{store_dict}/Filesummary.TXT", 'a') as infile:
-        infile.write(f'{current_file_number} {file_stats[1]} {file_stats[2]} {file_stats[3]} {file_stats[4]} {file_stats[5]} {file_stats[6]} {file_stats[7]} {Total_frames}\n')
-        infile.flush()
-
-        infile.write('Channel Aligned_OK Aligned_Error\n')
-        for i in range(NUM_CHANNELS):
-            infile.write(f'Channel_{i} {current_channel_stats[i]} {current_channel_stats[NUM_CHANNELS + i]}\n')
-    return file_stats, current_channel_stats
-# end def exec_data
-
-
-# ---------------------------------------------------------------------------------------------#
-
-
-## Current_Monitor
-def Current_monitor():
-    I2C_Addr = 0x9e >> 1  # I2C address of first LTC2991, note that
-
-    # iic_write(1, I2C_Addr, 0, 0x06, 0x99)       # V1-V2 differential, Filter enabled, V3-V4 differential, Filter enabled
-    iic_write(1, I2C_Addr, 0, 0x06, 0x11)  # V1-V2 differential, Filter enabled, V3-V4 differential, Filter enabled
-    # print(iic_read(0, I2C_Addr, 1, 0x06))       # read back control register
-
-    iic_write(1, I2C_Addr, 0, 0x01, 0x38)  # V1-V2 and V3-V4 enabled, VCC and T internal enabled
-
-    # print(hex(iic_read(0, I2C_Addr, 1, 0x00)))  # status low 
-    # print(hex(iic_read(0, I2C_Addr, 1, 0x01)))  # status high
-    V12_Volt = 0
-    I12 = 0
-    V12_MSB = iic_read(0, I2C_Addr, 1, 0x0C)  # V1-V2 MSB
-    V12_LSB = iic_read(0, I2C_Addr, 1, 0x0D)  # V1-V2 LSB
-    V12_Valid = (V12_MSB & 0x80) >> 7
-    V12_Sign = (V12_MSB & 0x40) >> 6
-    if V12_Sign == 0:
-        V12_Volt = ((V12_MSB & 0x3f) << 8 | V12_LSB) * 19.075 * 1E-6
-    I12 = 982.5 * V12_Volt - 10.489
-    # print("V1-V2 volt: %.3f V, I12：%.3f mA"%(V12_Volt, I12))
-
-    V34_Volt = 0
-    I34 = 0
-    V34_MSB = iic_read(0, I2C_Addr, 1, 0x10)  # V3-V4 MSB
-    V34_LSB = iic_read(0, I2C_Addr, 1, 0x11)  # V3-V4 LSB
-    V34_Valid = (V34_MSB & 0x80) >> 7
-    V34_Sign = (V34_MSB & 0x40) >> 6
-    if V34_Sign == 0:
-        V34_Volt = ((V34_MSB & 0x3f) << 8 | V34_LSB) * 19.075 * 1E-6
-    I34 = 949.0 * V34_Volt + 0.0258
-    # print("V3-V4 volt: %.3f V, I34：%.3f mA"%(V34_Volt, I34))
-
-    VCC_MSB = iic_read(0, I2C_Addr, 1, 0x1C)  # VCC MSB
-    VCC_LSB = iic_read(0, I2C_Addr, 1, 0x1D)  # VCC LSB
-
-    VCC_Volt = ((VCC_MSB & 0x3f) << 8 | VCC_LSB) * 0.00030518 + 2.5
-    # print("VCC volt: %.3f"%VCC_Volt)
-    return [I12, I34]
-
-
-# ---------------------------------------------------------------------------------------------#
-
-# ---------------------------------------------------------------------------------------------#
-# # IIC write slave device
-# @param mode[1:0] : '0'is 1 bytes read or wirte, '1' is 2 bytes read or write, '2' is 3 bytes read or write
-# @param slave[7:0] : slave device address
-# @param wr: 1-bit '0' is write, '1' is read
-# @param reg_addr[7:0] : register address
-# @param data[7:0] : 8-bit write data
-def iic_write(mode, slave_addr, wr, reg_addr, data):
-    val = mode << 24 | slave_addr << 17 | wr << 16 | reg_addr << 8 | data
-    cmd_interpret.write_config_reg(4, 0xffff & val)
-    cmd_interpret.write_config_reg(5, 0xffff & (val >> 16))
-    time.sleep(0.1)
-    cmd_interpret.write_pulse_reg(0x0001)  # reset ddr3 data fifo
-    time.sleep(0.1)
-
-
-# ---------------------------------------------------------------------------------------------#
-
-
-# ---------------------------------------------------------------------------------------------#
-## IIC read slave device
-# @param mode[1:0] : '0'is 1 bytes read or wirte, '1' is 2 bytes read or write, '2' is 3 bytes read or write
-# @param slave[6:0]: slave device address
-# @param wr: 1-bit '0' is write, '1' is read
-# @param reg_addr[7:0] : register address
-def iic_read(mode, slave_addr, wr, reg_addr):
-    val = mode << 24 | slave_addr << 17 | 0 << 16 | reg_addr << 8 | 0x00  # write device addr and reg addr
-    cmd_interpret.write_config_reg(4, 0xffff & val)
-    cmd_interpret.write_config_reg(5, 0xffff & (val >> 16))
-    time.sleep(0.01)
-    cmd_interpret.write_pulse_reg(0x0001)  # Sent a pulse to IIC module
-
-    val = mode << 24 | slave_addr << 17 | wr << 16 | reg_addr << 8 | 0x00  # write device addr and read one byte
-    cmd_interpret.write_config_reg(4, 0xffff & val)
-    cmd_interpret.write_config_reg(5, 0xffff & (val >> 16))
-    time.sleep(0.01)
-    cmd_interpret.write_pulse_reg(0x0001)  # Sent a pulse to IIC module
-    time.sleep(0.1)  # delay 10ns then to read data
-    return cmd_interpret.read_status_reg(0) & 0xff
-
-
-# ---------------------------------------------------------------------------------------------#
-
-
 
 # ------------------------------------------------------------------------------------------------#
 ## if statement
@@ -733,6 +434,7 @@ if __name__ == "__main__":
     except socket.error:
         print("failed to connect to ip:" + hostname)
     cmd_interpret = command_interpret(s)  # Class instance
+    attach(cmd_interpret)  # I2C helpers of the shared core use the same link
     try:
         main()  # execute main function
     except KeyboardInterrupt:
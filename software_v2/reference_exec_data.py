@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Frozen copy of the original exec_data of main_v2.py, the oracle of decoder_check.py.
+
+write_error_data and exec_data below are the main_v2.py code as it was before the
+decoding moved into gbcr3_daq (the bitwise crc32_8 CRC, the 11-column ChStat, one
+ChAll.TXT / Ch{N}.TXT append per error frame). Do not edit or optimize them: every
+gbcr3_daq decoder is checked against exactly this behaviour. decoder_check.py may
+swap the module-level crc32_8 for a table CRC once it has checked the two agree.
+'''
+import datetime
+
+from gbcr3_daq.crc32_8 import crc32_8
+
+# Constants
+NUM_CHANNELS = 9
+MAX_CHANNEL_ID = 10
+
+
+# ------------------------------------------------------------------#
+def write_error_data(store_dict, channel_id, time_obj, channel_id_val, inject_error, error_counter, 
+                     crc_diff, time_stamp, expected_code, received_code, error_position, crc32):
+    """Write error data to both ChAll.TXT and individual channel files."""
+    error_line = f'{time_obj} {channel_id_val} {inject_error} {error_counter} {crc_diff} {time_stamp} {expected_code:08x} {received_code:08x} {error_position:08x} {crc32}\n'
+    
+    # Write to main error file
+    with open(f"./{store_dict}/ChAll.TXT", 'a') as infile:
+        infile.write(error_line)
+        infile.flush()
+    
+    # Write to individual channel file
+    with open(f"./{store_dict}/Ch{channel_id}.TXT", 'a') as infile:
+        infile.write(error_line)
+        infile.flush()
+
+
+# ------------------------------------------------------------------#
+def exec_data(mem_data, store_dict, dbg_mode=0, current_file_number=0):
+    isEnd = False
+    count = 0
+    aligned = 0
+    i = 0
+
+    dbg = (dbg_mode == 1)
+    #
+    # Collect frame stat=2*Aligned+Err by channel  
+    # Ch=9 is filler without channel ID 
+    #
+    ChStat = [
+        [0,0,0,0,0,0,0,0,0,0,0],
+        [0,0,0,0,0,0,0,0,0,0,0],
+        [0,0,0,0,0,0,0,0,0,0,0],
+        [0,0,0,0,0,0,0,0,0,0,0]
+    ]
+    # for i in range(6250)
+    while i < 50001:
+        # get 8 words to combine a frame
+        val = [0, 0, 0, 0, 0, 0, 0, 0]
+        for k in range(8):
+            if i > 50000:
+                isEnd = True
+            else:
+                val[k] = mem_data[i]
+                i = i + 1
+            #end if
+        if val[-1] < 0:
+            # print("line 204", val)
+            isEnd = True
+        if isEnd:
+            break
+        Rawdata = val[0] << (96 + 128) | val[1] << (64 + 128) | val[2] << (32 + 128) | val[3] << 128 | val[4] << 96 | val[5] << 64 | val[6] << 32 | val[7]
+        # end get 8 words
+        # if i<200: 
+        #  print("i=%5i aligned=%i Rawdata=%x" % (i,aligned,Rawdata) )
+        # #end if
+        # tentative evaluation Error flag and channel ID  
+        StatErr  = val[0]>>31&1 
+        StatChan = val[0]>>27&0xF  
+
+        aligned_error_counter = 0
+        if aligned == 1:
+            error_flag = (
+                                 Rawdata & 0x8000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (127 + 128)  # error flag
+
+            # if aligned, display on the screen and save to files
+            if error_flag == 1:
+                aligned_error_counter += 1
+                channel_id = (
+                                     Rawdata & 0x7800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
+                                     123 + 128)  # channel Id
+                time_stamp = (
+                                     Rawdata & 0x07ff_ffff_ffff_f800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
+                                     79 + 128 - 4)  # time stamp
+                inject_error = (
+                                       Rawdata & 0x0000_0000_0000_07ff_f800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
+                                       59 + 128)  # inject error
+                expected_code = (
+                                        Rawdata & 0x0000_0000_0000_0000_07ff_ffff_f800_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
+                                        27 + 128)
+                received_code = (
+                                        Rawdata & 0x0000_0000_0000_0000_0000_0000_07ff_ffff_f800_0000_0000_0000_0000_0000_0000_0000) >> 123  # received data
+                error_position = (
+                                         Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_07ff_ffff_f800_0000_0000_0000_0000_0000) >> 91
+                error_counter = (
+                                        Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_07ff_ffff_ffff_ffff_0000_0000) >> 32
+                crc32 = (
+                                Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_ffff_ffff) >> 0
+                cal_crc_data = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+                for k in range(28):
+                    shift = 0xff00_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000 >> (k * 8)
+                    cal_crc_data[k] = (Rawdata & shift) >> (248 - k * 8)
+                # end for
+                cal_crc32 = crc32_8(cal_crc_data[0], 0xffff_ffff)
+                for k in range(27):
+                    cal_crc32_t = crc32_8(cal_crc_data[k + 1], cal_crc32)
+                    cal_crc32 = cal_crc32_t
+
+                Time = datetime.datetime.now()
+                if dbg == 1 and aligned_error_counter < 20: 
+                    print(f'{Time} {channel_id} {inject_error} {error_counter} {cal_crc32 - crc32} {time_stamp} {expected_code:08x} {received_code:08x} {error_position:08x} {crc32}')
+                
+                # Write error data to both files using helper function
+                write_error_data(store_dict, channel_id, Time, channel_id, inject_error, error_counter, 
+                               cal_crc32 - crc32, time_stamp, expected_code, received_code, error_position, crc32)
+                # Frame stat Aligned with Error
+                if channel_id < MAX_CHANNEL_ID:
+                    ChStat[3][channel_id] = ChStat[3][channel_id] + 1
+                else:
+                    if dbg == 1: print(f"Bad channel_id {channel_id}")
+                    ChStat[3][10] = ChStat[3][10] + 1
+                #end if
+            else:  # error_flag != 1
+                if Rawdata == 0x3c5c_7c5c_0000_0000_0000_0000_1234_4321_7d6d_7a5a_0000_0000_0000_0000_5566_6655:
+                    ChStat[2][9] = ChStat[2][9] + 1 
+                else:
+                    channel_id = (
+                                     Rawdata & 0x7800_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000) >> (
+                                     123 + 128)  # channel Id
+                    crc32 = (
+                                Rawdata & 0x0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_ffff_ffff) >> 0
+                    cal_crc_data = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+                    for k in range(28):
+                        shift = 0xff00_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000_0000 >> (k * 8)
+                        cal_crc_data[k] = (Rawdata & shift) >> (248 - k * 8)
+                    cal_crc32 = crc32_8(cal_crc_data[0], 0xffff_ffff)
+                    for k in range(27):
+                        cal_crc32_t = crc32_8(cal_crc_data[k + 1], cal_crc32)
+                        cal_crc32 = cal_crc32_t
+                        
+                    if cal_crc32 - crc32 == 0 and channel_id < MAX_CHANNEL_ID:
+                        ChStat[2][channel_id] = ChStat[2][channel_id] + 1
+                    else:
+                        aligned = 0
+                        if dbg == 1: print(f"Line 407, ALignment loss Rawdata is {Rawdata:x}")
+                        ChStat[2][10] = ChStat[2][10] + 1
+            # end if error_flag
+        else:  # aligned != 1
+            if i<200 and dbg == 1:
+                print(f"Not aligned chan={StatChan}  Rawdata={Rawdata:x}")
+            while aligned == 0:
+                if i > 50000:
+                    isEnd = True
+                else:
+                    value = mem_data[i]
+                    i = i + 1
+                    if value < 0:
+                        isEnd = True
+                    else:
+                        for k in range(7):
+                            val[k] = val[k + 1]
+                        val[7] = value
+                        Rawdata = val[0] << (96 + 128) | val[1] << (64 + 128) | val[2] << (32 + 128) | val[3] << 128 | val[4] << 96 | val[5] << 64 | val[6] << 32 | val[7]
+                    # end if
+                    if Rawdata == 0x3c5c_7c5c_0000_0000_0000_0000_1234_4321_7d6d_7a5a_0000_0000_0000_0000_5566_6655:
+                        #print("aligned here")
+                        aligned = 1
+                        # Filler frame without channel - use chan=9
+                        ChStat[2][9] = ChStat[2][9] + 1;
+                    else:
+                        #print("not aligned here")
+                        aligned = 0
+                        # make best attempt to dead reckoning alignment for no-alignment frames 
+                        remainder = i % 8
+                        if isEnd==0 and remainder==1:  
+                            ErrNA  = val[0]>>31&1 
+                            ChanNA = val[0]>>27&0xF
+                            if ChanNA > (NUM_CHANNELS - 1):
+                                if dbg == 1: print(f"Not aligned i={i} bad chan={ChanNA}  Rawdata={Rawdata:x}")
+                                ChanNA = NUM_CHANNELS - 1
+                            else:
+                                if dbg == 1: print(f"Not aligned i={i} chan={ChanNA}  Rawdata={Rawdata:x}")
+                            #end if
+                            ChStat[ErrNA][ChanNA] = ChStat[ErrNA][ChanNA] + 1 
+                        #end if remainer = 1 
+                    # end if
+                if isEnd:
+                    break
+            # end while aligned
+        # end if aligned
+    # end for 6250. One buffer is done.
+
+    #print("loops ended")
+    ChanCnt_NA_OK = 0
+    ChanCnt_NA_Err = 0
+    ChanCnt_AL_Err = 0
+    ChanCnt_AL_OK = 0
+    Total_frames = 0
+    
+    for n in range(3):
+        if n == 0:
+            for m in range(11):
+                ChanCnt_NA_OK = ChanCnt_NA_OK + ChStat[n][m]
+        if n == 1:
+            for m in range(11):
+                ChanCnt_NA_Err = ChanCnt_NA_Err + ChStat[n][m]
+        if n > 1:
+            for m in range(NUM_CHANNELS):
+                if dbg == 1:
+                    print(f" file summary Chan {m}: Data frame Aligned Err/OK={ChStat[3][m]}/{ChStat[2][m]}")
+                ChanCnt_AL_Err += ChStat[3][m]
+                ChanCnt_AL_OK  += ChStat[2][m]
+
+    if dbg == 1:
+        print(f" file summary filler frames= {ChStat[2][9]}")
+        print(f" file summary aligned data OK= {ChanCnt_AL_OK}")
+        print(f" file summary aligned data Err= {ChanCnt_AL_Err}")
+        print(f" file summary: Not aligned Err/OK={ChanCnt_NA_Err}/{ChanCnt_NA_OK}")
+        print(f" file summary ALignment loss: {ChStat[2][10]}")
+        print(f" file summary Aligned with Error, bad channel id: {ChStat[3][10]}")
+        print(" Next File...")
+        
+    Total_frames = ChStat[2][9] + ChanCnt_AL_OK + ChanCnt_AL_Err + ChanCnt_NA_Err + ChanCnt_NA_OK + ChStat[2][10] + ChStat[3][10]
+
+    data_exist_counter = ChanCnt_AL_OK + ChanCnt_AL_Err
+
+    file_stats = [1,ChStat[2][9], ChanCnt_AL_OK, ChanCnt_AL_Err, ChanCnt_NA_Err, ChanCnt_NA_OK, ChStat[2][10], 
+                 ChStat[3][10], 1 if data_exist_counter == 0 else 0]
+
+    # Collect channel statistics: [aligned_OK_ch0..ch8, aligned_Error_ch0..ch8]
+    current_channel_stats = [ChStat[2][i] for i in range(NUM_CHANNELS)]  # Aligned OK
+    current_channel_stats.extend([ChStat[3][i] for i in range(NUM_CHANNELS)])  # Aligned Error
+
+
+    with open(f"./{store_dict}/Filesummary.TXT", 'a') as infile:
+        infile.write(f'{current_file_number} {file_stats[1]} {file_stats[2]} {file_stats[3]} {file_stats[4]} {file_stats[5]} {file_stats[6]} {file_stats[7]} {Total_frames}\n')
+        infile.flush()
+
+        infile.write('Channel Aligned_OK Aligned_Error\n')
+        for i in range(NUM_CHANNELS):
+            infile.write(f'Channel_{i} {current_channel_stats[i]} {current_channel_stats[NUM_CHANNELS + i]}\n')
+    return file_stats, current_channel_stats
+# end def exec_data
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Offline replay of raw FIFO captures (main_v2.py --capture, Raw.bin or the
+compressed Raw.arc), no hardware needed.
+
+Every buffer of a capture goes through the same decode, file statistics and run
+summary as in main_v2.py Receive_data, padded the same way, and the results are
+written to a new QAResults_v2/<run>_replay_<time> directory: Filesummary.TXT,
+FileStats.csv, ChAll.TXT, Ch{N}.TXT and summary.txt (I2C.TXT and IDD.TXT need
+the hardware). The error records keep the host time of their readout, as
+recorded in the capture index, so the ChAll.TXT times and summary.txt match the
+original run.
+Several captures are replayed in parallel, one per worker process; a single
+capture is decoded by --jobs ParallelDecoder workers (fast decoder only).
+
+    python replay_v2.py QAResults_v2/2025-01-01_10-00-00 --jobs 4
+    python replay_v2.py QAResults_v2/*/Raw.bin --jobs 8 --decoder stream
+'''
+import os
+import sys
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+# the shared DAQ core package gbcr3_daq lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from gbcr3_daq import decode
+from gbcr3_daq.decode import (NUM_CHANNELS, CHANNEL_STATS_SIZE, MAX_CHANNEL_ID, exec_data, exec_data_fast, exec_data_stream,
+                              record_file, start_file_summary)
+from gbcr3_daq.fifo_decoder import fifo_to_bytes
+from gbcr3_daq.parallel_decode import ParallelDecoder
+from gbcr3_daq.raw_archive import open_capture
+from gbcr3_daq.summary import generate_summary, write_run_totals
+
+FIFO_WORDS = 50000
+
+
+# ------------------------------------------------------------------#
+def replay_capture(capture_path, store_dict, decoder='fast', dbg_mode=0, workers=1):
+    """Decode every buffer of one capture into the run directory store_dict; returns (buffers, seconds).
+
+    With workers > 1 the fast decoder runs in a ParallelDecoder of that many processes.
+    """
+    start = time.perf_counter()
+    os.makedirs(store_dict, exist_ok=True)
+    start_file_summary(store_dict)
+    decode.file_stats_stream.open(f"./{store_dict}/FileStats.csv")
+    decode.stream_decoder.reset()
+    decode.error_writers.keep_open = True
+    decode_file = {'fast': exec_data_fast, 'stream': exec_data_stream}.get(decoder, exec_data)
+
+    total_stats = [0, 0, 0, 0, 0, 0, 0, 0, 0]
+    single_ch_stats = [0] * CHANNEL_STATS_SIZE
+    pool = ParallelDecoder(workers, NUM_CHANNELS - 1, MAX_CHANNEL_ID) if workers > 1 else None
+    capture = open_capture(capture_path)
+    for k in range(len(capture)):
+        number, readout_time = capture.index[k][:2]
+        mem_data = capture.words(k)[:-1]
+        # same padding as Receive_data; the stream decoder only takes the words actually read
+        if decoder != 'stream':
+            mem_data.extend([0] * (FIFO_WORDS - len(mem_data)))
+        mem_data.append(-1)
+        if pool is not None:
+            # results come back in file order, tagged with their file number and readout time
+            pool.submit((number, readout_time), fifo_to_bytes(mem_data))
+            decoded = [record_file(ChStat, errors, store_dict, dbg_mode, *tag) for tag, ChStat, errors in pool.collect()]
+        else:
+            decoded = [decode_file(mem_data, store_dict, dbg_mode, number, readout_time)]
+        for file_stats, current_channel_stats in decoded:
+            _add_stats(total_stats, single_ch_stats, file_stats, current_channel_stats)
+    if pool is not None:
+        for tag, ChStat, errors in pool.collect(wait=True):
+            _add_stats(total_stats, single_ch_stats, *record_file(ChStat, errors, store_dict, dbg_mode, *tag))
+        pool.close()
+    capture.close()
+    decode.error_writers.close()
+    decode.file_stats_stream.close()
+
+    write_run_totals(store_dict, total_stats, single_ch_stats)
+    generate_summary(store_dict, dbg_mode)
+    return len(capture), time.perf_counter() - start
+
+
+def _add_stats(total_stats, single_ch_stats, file_stats, current_channel_stats):
+    for i in range(len(total_stats)):
+        total_stats[i] += file_stats[i]
+    for i in range(len(current_channel_stats)):
+        single_ch_stats[i] += current_channel_stats[i]
+
+
+def _replay_quiet(capture_path, store_dict, decoder, dbg_mode):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return replay_capture(capture_path, store_dict, decoder, dbg_mode)
+
+
+def run_name(capture_path):
+    """Name of the run a capture belongs to: its run directory."""
+    path = os.path.abspath(capture_path)
+    return os.path.basename(path if os.path.isdir(path) else os.path.dirname(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay raw FIFO captures through the main_v2 decode pipeline')
+    parser.add_argument('captures', nargs='+', help='Raw.bin / Raw.arc files or the run directories holding them')
+    parser.add_argument('--decoder', choices=['fast', 'original', 'stream'], default='fast',
+                        help='FIFO decoder, as in main_v2.py (default fast)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Captures replayed in parallel, or decode workers for a single capture (default 1)')
+    parser.add_argument('--output', default='QAResults_v2', help='Directory of the result trees (default QAResults_v2)')
+    parser.add_argument('--debug', type=int, choices=[0, 1], default=0, help='Debug mode as in main_v2.py (--jobs 1)')
+    args = parser.parse_args()
+    if args.jobs > 1 and len(args.captures) == 1 and args.decoder != 'fast':
+        parser.error('--jobs with a single capture needs the fast decoder')
+
+    timestr = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime())
+    # the decode writers take run directories relative to the working directory
+    jobs = [(path, os.path.relpath(f"{args.output}/{run_name(path)}_replay_{timestr}")) for path in args.captures]
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [(path, store_dict, pool.submit(_replay_quiet, path, store_dict, args.decoder, 0))
+                       for path, store_dict in jobs]
+            for path, store_dict, future in futures:
+                buffers, seconds = future.result()
+                print(f"{path}: {buffers} buffers in {seconds:.1f} s -> {store_dict}")
+    else:
+        for path, store_dict in jobs:
+            buffers, seconds = replay_capture(path, store_dict, args.decoder, args.debug, args.jobs)
+            print(f"{path}: {buffers} buffers in {seconds:.1f} s -> {store_dict}")
+
+
+if __name__ == "__main__":
+    main()